@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+"""
+Measures the throughput (revisions/sec) of the revert detection core over
+synthetic page histories and compares it to a stored baseline.
+
+Usage:
+    bench.py (-h|--help)
+    bench.py [--baseline=<path>] [--save] [--threshold=<ratio>]
+             [--only=<name>...] [--quick] [--repeat=<num>]
+
+Options:
+    -h|--help             Print this documentation
+    --baseline=<path>     The path to a JSON file of baseline throughputs.
+                          [default: <benchmarks/baseline.json>]
+    --save                Write the measurements to the baseline file rather
+                          than comparing against it.  Cases that weren't
+                          run keep their stored baseline.
+    --threshold=<ratio>   The fraction of baseline throughput that a
+                          measurement may lose before it's reported as a
+                          regression. [default: 0.25]
+    --only=<name>         Only run the named benchmark(s).
+    --quick               Sweep a reduced set of parameters.
+    --repeat=<num>        How many times to run each case.  The best time is
+                          kept. [default: 3]
+
+Benchmarks sweep radius sizes, revert densities and page lengths.  Each
+case is reported as `<benchmark>/radius=<r>/density=<d>/length=<n>`.  The
+exit status is 1 if any case regressed past the threshold.  Baselines are
+machine-specific, so regenerate them with --save when changing hardware.
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from itertools import product
+from random import Random
+
+import docopt
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from mwreverts import api  # noqa
+from mwreverts.detector import Detector  # noqa
+from mwreverts.functions import detect  # noqa
+from mwreverts.historical_dict import HistoricalDict  # noqa
+from mwreverts.utilities.revdocs2reverts import revdocs2reverts  # noqa
+
+try:
+    from mwreverts import db
+except ImportError:  # sqlalchemy is not installed
+    db = None
+
+RADII = [1, 15, 100, 1000]
+DENSITIES = [0.0, 0.1, 0.5]
+LENGTHS = [1000, 10000]
+
+QUICK_RADII = [15, 1000]
+QUICK_DENSITIES = [0.1]
+QUICK_LENGTHS = [10000]
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "baseline.json")
+"""
+The default baseline file (next to this script)
+"""
+
+MAX_TUPLE_CALLS = 200
+"""
+The maximum number of calls to build_revert_tuple() per case
+"""
+
+Row = namedtuple("Row", ['rev_id', 'rev_sha1'])
+
+
+def main(argv=None):
+    args = docopt.docopt(__doc__, argv=argv)
+
+    if args['--quick']:
+        sweep = list(product(QUICK_RADII, QUICK_DENSITIES, QUICK_LENGTHS))
+    else:
+        sweep = list(product(RADII, DENSITIES, LENGTHS))
+
+    names = args['--only'] or list(BENCHMARKS.keys())
+    for name in names:
+        if name not in BENCHMARKS:
+            raise ValueError("Unknown benchmark {0}".format(repr(name)))
+
+    if args['--baseline'] == "<benchmarks/baseline.json>":
+        baseline_path = BASELINE
+    else:
+        baseline_path = args['--baseline']
+
+    results = run(names, sweep, int(args['--repeat']))
+
+    if args['--save']:
+        if os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+        else:
+            baseline = {}
+        baseline.update(results)
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+    else:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, float(args['--threshold']))
+        sys.exit(1 if regressions > 0 else 0)
+
+
+def run(names, sweep, repeat):
+    results = {}
+    for name in names:
+        benchmark = BENCHMARKS[name]
+        for radius, density, length in sweep:
+            history = generate_history(radius, density, length)
+            key = case_key(name, radius, density, length)
+
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                revisions = benchmark(history, radius)
+                duration = time.perf_counter() - start
+                if revisions is None:
+                    break
+                best = duration if best is None else min(best, duration)
+
+            if best is not None:
+                results[key] = revisions / best
+                sys.stderr.write("{0}\t{1:,.0f} revs/sec\n"
+                                 .format(key, results[key]))
+            else:
+                sys.stderr.write("{0}\tskipped\n".format(key))
+
+    return results
+
+
+def compare(results, baseline, threshold):
+    regressions = 0
+    for key, throughput in sorted(results.items()):
+        if key not in baseline:
+            continue
+        ratio = throughput / baseline[key]
+        if ratio < 1 - threshold:
+            regressions += 1
+            sys.stderr.write(("REGRESSION {0}: {1:,.0f} revs/sec is " +
+                              "{2:.0%} of the baseline\n")
+                             .format(key, throughput, ratio))
+
+    sys.stderr.write("{0} regression(s) in {1} case(s)\n"
+                     .format(regressions, len(results)))
+    return regressions
+
+
+def case_key(name, radius, density, length):
+    return "{0}/radius={1}/density={2}/length={3}".format(
+        name, radius, density, length)
+
+
+def generate_history(radius, density, length, seed=0):
+    """
+    Generates a list of checksums.  With probability `density`, a revision
+    reverts back to a checksum seen within the last `radius` revisions.
+    Otherwise it has a new checksum.
+    """
+    random = Random(seed)
+    checksums = []
+    for i in range(length):
+        if i > 0 and random.random() < density:
+            distance = random.randint(1, min(radius, i))
+            checksums.append(checksums[i - distance])
+        else:
+            checksums.append(hashlib.sha1(bytes(str(i), 'utf8')).hexdigest())
+
+    return checksums
+
+
+def bench_historical_dict(history, radius):
+    d = HistoricalDict(radius + 1)
+    for i, checksum in enumerate(history):
+        if checksum in d:
+            list(d.up_to(checksum))
+        d.insert(checksum, i)
+    return len(history)
+
+
+def bench_detector_process(history, radius):
+    detector = Detector(radius)
+    for i, checksum in enumerate(history):
+        detector.process(checksum, i)
+    return len(history)
+
+
+def bench_detect(history, radius):
+    for _ in detect(((checksum, i) for i, checksum in enumerate(history)),
+                    radius=radius):
+        pass
+    return len(history)
+
+
+def bench_revdocs2reverts(history, radius):
+    page = {'id': 1, 'title': "Benchmark"}
+    rev_docs = ({'id': i, 'page': page, 'text': checksum}
+                for i, checksum in enumerate(history))
+    for _ in revdocs2reverts(rev_docs, radius=radius):
+        pass
+    return len(history)
+
+
+def bench_revdocs2reverts_lines(history, radius):
+    page = {'id': 1, 'title': "Benchmark"}
+    lines = [json.dumps({'id': i, 'page': page, 'comment': "Benchmark",
+                         'text': checksum * 100, 'sha1': checksum})
+             for i, checksum in enumerate(history)]
+    for _ in revdocs2reverts(lines, radius=radius, fields=['id']):
+        pass
+    return len(history)
+
+
+def bench_api_build_revert_tuple(history, radius):
+    revs = [{'revid': i, 'sha1': checksum}
+            for i, checksum in enumerate(history)]
+    return bench_build_revert_tuple(api.build_revert_tuple, revs, radius)
+
+
+def bench_db_build_revert_tuple(history, radius):
+    if db is None:
+        return None
+    rows = [Row(i, checksum) for i, checksum in enumerate(history)]
+    return bench_build_revert_tuple(db.build_revert_tuple, rows, radius)
+
+
+def bench_build_revert_tuple(build_revert_tuple, revs, radius):
+    if radius * 2 + 1 > len(revs):
+        return None
+
+    positions = range(radius, len(revs) - radius)
+    step = max(1, len(positions) // MAX_TUPLE_CALLS)
+    revisions = 0
+    for i in positions[::step]:
+        build_revert_tuple(i, revs[i - radius:i], revs[i],
+                           revs[i + 1:i + 1 + radius], radius)
+        revisions += radius * 2 + 1
+
+    return revisions
+
+
+BENCHMARKS = {
+    'historical_dict': bench_historical_dict,
+    'detector_process': bench_detector_process,
+    'detect': bench_detect,
+    'revdocs2reverts': bench_revdocs2reverts,
+    'revdocs2reverts_lines': bench_revdocs2reverts_lines,
+    'api_build_revert_tuple': bench_api_build_revert_tuple,
+    'db_build_revert_tuple': bench_db_build_revert_tuple
+}
+
+
+if __name__ == "__main__":
+    main()
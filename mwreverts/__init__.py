@@ -20,11 +20,15 @@ revisioned content.
 
 """
 from .detector import Detector, Revert
+from .digest_detector import DigestDetector
+from .multi_page_detector import MultiPageDetector
 from .functions import detect
+from .arrays import detect_array
 from .dummy_checksum import DummyChecksum
 from .about import (__name__, __version__, __author__, __author_email__,
                     __description__, __license__, __url__)
 
-__all__ = [Detector, Revert, detect, DummyChecksum,
+__all__ = [Detector, DigestDetector, MultiPageDetector, Revert, detect,
+           detect_array, DummyChecksum,
            __name__, __version__, __author__, __author_email__,
            __description__, __license__, __url__]
@@ -0,0 +1,92 @@
+"""
+Whole-page revert detection over arrays of checksums.  Rather than calling
+:func:`~mwreverts.Detector.process` once per revision, the last occurrence of
+every checksum is computed in a single batch (a stable sort) and reverts are
+read off with vectorized comparisons.
+
+This module requires :mod:`numpy`.
+"""
+from . import defaults
+from .revert import Revert
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def is_array(value):
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def detect_array(checksums, radius=defaults.RADIUS):
+    """
+    Detects reverts in a page's whole history of checksums.  The output is
+    identical to processing `checksums` in order with
+    :class:`mwreverts.Detector`.
+
+    :Parameters:
+        checksums : `array_like`
+            a one-dimensional array of checksums (e.g. integer-encoded
+            digests) ordered chronologically
+        radius : int
+            a positive integer indicating the maximum revision distance that a
+            revert can span.
+
+    :Returns:
+        A tuple of four parallel :class:`numpy.ndarray` of indexes into
+        `checksums`:
+
+        * reverting -- the reverting revision
+        * reverted_start -- the first reverted revision
+        * reverted_end -- one past the last reverted revision
+        * reverted_to -- the reverted-to revision
+
+    :Example:
+        >>> import mwreverts
+        >>>
+        >>> mwreverts.detect_array([10, 11, 10, 12])
+        (array([2]), array([1]), array([2]), array([0]))
+    """
+    if numpy is None:
+        raise ImportError("detect_array() requires numpy")
+    if radius < 1:
+        raise TypeError("invalid radius. Expected a positive integer.")
+
+    checksums = numpy.asarray(checksums)
+    if checksums.ndim != 1:
+        raise TypeError("invalid checksums. Expected a one-dimensional array.")
+
+    # Find the previous occurrence of each checksum.  A stable sort keeps
+    # equal checksums in chronological order, so neighbors in the sort order
+    # are consecutive occurrences.
+    order = numpy.argsort(checksums, kind='stable')
+    ordered = checksums[order]
+    repeats = ordered[1:] == ordered[:-1]
+    previous = numpy.full(len(checksums), -1, dtype=numpy.intp)
+    previous[order[1:][repeats]] = order[:-1][repeats]
+
+    # A revert occurs when the previous occurrence is within the window and
+    # at least one revision separates the two.
+    distance = numpy.arange(len(checksums)) - previous
+    reverting = numpy.flatnonzero(
+        (previous >= 0) & (distance > 1) & (distance <= radius + 1))
+    reverted_to = previous[reverting]
+
+    return reverting, reverted_to + 1, reverting.copy(), reverted_to
+
+
+def detect_array_reverts(checksums, radius=defaults.RADIUS, revisions=None):
+    """
+    Detects reverts in an array of checksums and generates
+    :class:`mwreverts.Revert` events built from `revisions` (or the
+    positional indexes of `checksums` if not provided).
+    """
+    if revisions is None:
+        revisions = range(len(checksums))
+
+    for reverting, start, end, reverted_to in \
+            zip(*(a.tolist() for a in detect_array(checksums, radius))):
+        yield Revert(revisions[reverting],
+                     [revisions[i] for i in range(end - 1, start - 1, -1)],
+                     revisions[reverted_to])
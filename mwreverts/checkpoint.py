@@ -0,0 +1,224 @@
+"""
+This module provides a compact binary serialization of the state of a
+:class:`mwreverts.Detector` or :class:`mwreverts.DigestDetector` so that
+per-page detection can be checkpointed and resumed between runs.
+
+A checkpoint is laid out as follows (all integers are little-endian):
+
+* header -- `struct` ``<4sBBBBIIq``: magic ``b"MWRV"``, format version,
+  detector kind, flags, the number of radii (0 for a single radius),
+  checksum width, radius and the number of revisions in the window
+* known -- one byte per revision: 1 if the checksum is known, else 0
+* checksums -- `width` bytes per revision (zeros when unknown)
+* handles -- a signed 64-bit integer per revision
+* radii -- an unsigned 32-bit integer per radius of a multi-radius
+  :class:`~mwreverts.Detector` (see `radius`)
+
+Checksums must all be `bytes` (or all `str`) of the same length or all
+`int` (stored as signed 64-bit integers).  Revisions are stored as integer
+handles (e.g. rev_ids).  Use `handle` and `resolve` to map other revision
+data to and from handles.
+
+.. autofunction:: mwreverts.checkpoint.dumps
+
+.. autofunction:: mwreverts.checkpoint.loads
+"""
+import struct
+from array import array
+
+from .detector import Detector
+from .digest_detector import DigestDetector
+from .dummy_checksum import DummyChecksum
+
+MAGIC = b"MWRV"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBIIq")
+
+DETECTOR = 0
+DIGEST_DETECTOR = 1
+
+STR_CHECKSUMS = 1
+INTERN = 2
+LAZY = 4
+INT_CHECKSUMS = 8
+
+INT_WIDTH = 8
+
+
+def dumps(detector, handle=None):
+    """
+    Serializes the history window of a detector.
+
+    :Parameters:
+        detector : :class:`mwreverts.Detector` |
+                   :class:`mwreverts.DigestDetector`
+            the detector to checkpoint
+        handle : `func`
+            converts a revision into an `int` handle.  If not set, revisions
+            must already be `int`.
+
+    :Returns:
+        `bytes`
+    """
+    flags = 0
+    radii = []
+    if isinstance(detector, DigestDetector):
+        kind = DIGEST_DETECTOR
+        width = detector.width
+        radius = detector.maxsize - 1
+        checksums, revisions = _digest_window(detector)
+    elif isinstance(detector, Detector):
+        kind = DETECTOR
+        radius = detector.maxsize - 1
+        checksums, revisions = _detector_window(detector)
+        if detector.interner is not None:
+            flags |= INTERN
+        if detector.lazy:
+            flags |= LAZY
+        if detector.radii is not None:
+            radii = detector.radii
+
+        width = None
+        for checksum in checksums:
+            if checksum is None:
+                continue
+            elif isinstance(checksum, int):
+                flags |= INT_CHECKSUMS
+                checksum_width = INT_WIDTH
+            else:
+                if isinstance(checksum, str):
+                    flags |= STR_CHECKSUMS
+                checksum_width = len(checksum)
+
+            if width is None:
+                width = checksum_width
+            elif checksum_width != width:
+                raise ValueError("Checksums of varying width can't be " +
+                                 "checkpointed.")
+        width = width or 0
+    else:
+        raise TypeError("Can't checkpoint a {0}".format(type(detector)))
+
+    known = bytearray(len(checksums))
+    digests = bytearray(len(checksums) * width)
+    for i, checksum in enumerate(checksums):
+        if checksum is not None:
+            if isinstance(checksum, str) != bool(flags & STR_CHECKSUMS) or \
+               isinstance(checksum, int) != bool(flags & INT_CHECKSUMS):
+                raise ValueError("Can't checkpoint a mix of str, bytes and " +
+                                 "int checksums.")
+            elif isinstance(checksum, str):
+                checksum = checksum.encode('ascii')
+            elif isinstance(checksum, int):
+                checksum = checksum.to_bytes(INT_WIDTH, 'little', signed=True)
+            known[i] = 1
+            digests[i * width:(i + 1) * width] = checksum
+
+    if handle is not None:
+        revisions = [handle(revision) for revision in revisions]
+    handles = array('q', revisions)
+
+    return b"".join([
+        HEADER.pack(MAGIC, VERSION, kind, flags, len(radii), width, radius,
+                    len(checksums)),
+        known, digests, handles.tobytes(), array('I', radii).tobytes()
+    ])
+
+
+def loads(data, resolve=None):
+    """
+    Restores a detector from a checkpoint.
+
+    :Parameters:
+        data : `bytes`
+            a checkpoint produced by :func:`~mwreverts.checkpoint.dumps`
+        resolve : `func`
+            converts an `int` handle back into a revision.  If not set, the
+            handles themselves are used as revisions.
+
+    :Returns:
+        a :class:`mwreverts.Detector` or :class:`mwreverts.DigestDetector`
+    """
+    magic, version, kind, flags, n_radii, width, radius, count = \
+        HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a mwreverts checkpoint.")
+    elif version != VERSION:
+        raise ValueError("Unsupported checkpoint version {0}"
+                         .format(version))
+
+    view = memoryview(data)
+    known_start = HEADER.size
+    digests_start = known_start + count
+    handles_start = digests_start + count * width
+
+    known = view[known_start:digests_start]
+    handles = array('q')
+    handles.frombytes(view[handles_start:handles_start + count * 8])
+    revisions = handles.tolist()
+    radii_start = handles_start + count * 8
+    radii = array('I')
+    radii.frombytes(view[radii_start:radii_start + n_radii * radii.itemsize])
+    if resolve is not None:
+        revisions = [resolve(revision) for revision in revisions]
+
+    checksums = []
+    for i in range(count):
+        if known[i]:
+            checksum = bytes(view[digests_start + i * width:
+                                  digests_start + (i + 1) * width])
+            if flags & STR_CHECKSUMS:
+                checksum = checksum.decode('ascii')
+            elif flags & INT_CHECKSUMS:
+                checksum = int.from_bytes(checksum, 'little', signed=True)
+            checksums.append(checksum)
+        else:
+            checksums.append(None)
+
+    if kind == DIGEST_DETECTOR:
+        detector = DigestDetector(radius, width=width)
+        for checksum, revision in zip(checksums, revisions):
+            checksum_hash = hash(checksum) if checksum is not None else 0
+            detector._insert(checksum, checksum_hash, revision)
+    elif kind == DETECTOR:
+        detector = Detector(radii.tolist() if n_radii > 0 else radius,
+                            intern=bool(flags & INTERN),
+                            lazy=bool(flags & LAZY))
+        for checksum, revision in zip(checksums, revisions):
+            if detector.interner is not None:
+                checksum = detector.interner.intern(checksum)
+            elif checksum is None:
+                checksum = DummyChecksum()
+            detector.insert(checksum, revision)
+    else:
+        raise ValueError("Unknown detector kind {0}".format(kind))
+
+    return detector
+
+
+def _detector_window(detector):
+    checksums, revisions = [], []
+    for checksum, revision in detector.history:
+        if detector.interner is not None:
+            checksum = detector.interner.checksum(checksum)
+        elif isinstance(checksum, DummyChecksum):
+            checksum = None
+        checksums.append(checksum)
+        revisions.append(revision)
+
+    return checksums, revisions
+
+
+def _digest_window(detector):
+    checksums, revisions = [], []
+    width = detector.width
+    for seq in range(max(detector.seq - detector.maxsize, 0), detector.seq):
+        position = seq % detector.maxsize
+        if detector.known[position]:
+            checksums.append(bytes(
+                detector.digests[position * width:(position + 1) * width]))
+        else:
+            checksums.append(None)
+        revisions.append(detector.revisions[position])
+
+    return checksums, revisions
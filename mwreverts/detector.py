@@ -1,5 +1,8 @@
+from bisect import bisect_left
+
 from . import defaults
 from .historical_dict import HistoricalDict
+from .interner import Interner
 from .revert import Revert
 
 
@@ -12,9 +15,23 @@ class Detector(HistoricalDict):
     See https://meta.wikimedia.org/wiki/R:Identity_revert
 
     :Parameters:
-        radius : int
+        radius : int | `iterable` ( int )
             a positive integer indicating the maximum revision distance that a
-            revert can span.
+            revert can span.  If a collection of radii is provided, a single
+            history window of the largest radius is kept and each
+            :class:`~mwreverts.Revert` is tagged with the smallest radius that
+            detects it (see `radius`).
+        intern : bool
+            if True, an :class:`~mwreverts.detector.InterningDetector` is
+            constructed.  Checksums are mapped to compact integer ids (see
+            :class:`mwreverts.interner.Interner`) before they are stored in
+            the history window and `None` may be passed as the checksum of a
+            revision whose content is unknown.
+        lazy : bool
+            if True, the `reverteds` of a :class:`~mwreverts.Revert` is a
+            lazy :class:`~mwreverts.historical_dict.HistorySlice` of the
+            history window that is only copied into a `list` when accessed
+            or serialized.
 
     :Example:
         >>> import mwreverts
@@ -28,13 +45,44 @@ class Detector(HistoricalDict):
                reverted_to={'rev_id': 1})
         >>> detector.process("ccc", {'rev_id': 4})
 
+    A revert spans `len(reverteds)` revisions and it is detected by every
+    radius at least that large, so a multi-radius detector finds the same
+    reverts as separate detectors for each radius:
+
+        >>> detector = mwreverts.Detector(radius=[1, 2])
+        >>>
+        >>> detector.process("aaa", {'rev_id': 1})
+        >>> detector.process("bbb", {'rev_id': 2})
+        >>> detector.process("ccc", {'rev_id': 3})
+        >>> detector.process("aaa", {'rev_id': 4})
+        Revert(reverting={'rev_id': 4},
+               reverteds=[{'rev_id': 3}, {'rev_id': 2}],
+               reverted_to={'rev_id': 1},
+               radius=2)
     """
 
-    def initialize(self, radius=defaults.RADIUS):
-        if radius < 1:
+    __slots__ = ('radii', 'interner', 'lazy')
+
+    def __new__(cls, *args, intern=False, **kwargs):
+        if intern and cls is Detector:
+            cls = InterningDetector
+        return super().__new__(cls, *args, **kwargs)
+
+    def initialize(self, radius=defaults.RADIUS, intern=False, lazy=False):
+        if isinstance(radius, int):
+            self.radii = None
+        else:
+            self.radii = sorted(set(radius))
+            if len(self.radii) == 0:
+                raise TypeError("invalid radius. Expected at least one.")
+            radius = self.radii[-1]
+
+        if radius < 1 or (self.radii is not None and self.radii[0] < 1):
             raise TypeError("invalid radius. Expected a positive integer.")
 
         super().initialize(maxsize=radius + 1)
+        self.interner = Interner() if intern else None
+        self.lazy = bool(lazy)
 
     def process(self, checksum, revision=None):
         """
@@ -56,10 +104,42 @@ class Detector(HistoricalDict):
 
         if checksum in self:  # potential revert
 
-            reverteds = list(self.up_to(checksum))
+            reverteds = self.since(checksum, lazy=self.lazy)
 
             if len(reverteds) > 0:  # If no reverted revisions, this is a noop
                 revert = Revert(revision, reverteds, self[checksum])
+                if self.radii is not None:
+                    revert.radius = self.radii[
+                        bisect_left(self.radii, len(reverteds))]
 
         self.insert(checksum, revision)
+
         return revert
+
+
+class InterningDetector(Detector):
+    """
+    A :class:`~mwreverts.Detector` that maps checksums to compact integer ids
+    (see :class:`mwreverts.interner.Interner`).  Construct one with
+    ``Detector(..., intern=True)``.  The interner still holds each checksum
+    in the window, so this doesn't save memory; it allows `None` to be
+    passed as an unknown checksum and checksums to be recovered for
+    checkpoints.  Plain detectors don't pay for interning.
+    """
+    __slots__ = ()
+
+    def initialize(self, *args, **kwargs):
+        kwargs['intern'] = True
+        super().initialize(*args, **kwargs)
+
+    def process(self, checksum, revision=None):
+        return super().process(self.interner.intern(checksum), revision)
+
+    def insert(self, key, value):
+        expectorate = super().insert(key, value)
+        if expectorate is not None:
+            old_checksum, _ = expectorate
+            if old_checksum not in self:
+                self.interner.release(old_checksum)
+
+        return expectorate
@@ -0,0 +1,183 @@
+from array import array
+
+from . import defaults
+from .dummy_checksum import DummyChecksum
+from .revert import Revert
+
+EMPTY = -1
+
+
+class DigestDetector:
+    """
+    Detects revert events in a stream of revisions (to the same page) based on
+    matching fixed-width binary digests (e.g. ``hashlib.sha1(...).digest()``).
+    This detector behaves exactly like :class:`mwreverts.Detector`, but it
+    stores the history window in a preallocated ring and finds matches with a
+    small open-addressing index.  A single instance can be re-used across
+    pages with :func:`~mwreverts.DigestDetector.reset`.
+
+    Its state is about a tenth the size of a :class:`mwreverts.Detector`'s,
+    but the index is probed in pure Python, so it processes revisions
+    slower.  Use it when many detectors are held in memory at once (e.g.
+    one per page of an interleaved stream); the utilities don't.
+
+    :Parameters:
+        radius : int
+            a positive integer indicating the maximum revision distance that a
+            revert can span.
+        width : int
+            the length (in bytes) of the digests that will be processed
+
+    :Example:
+        >>> import hashlib
+        >>> import mwreverts
+        >>>
+        >>> def sha1(text):
+        ...     return hashlib.sha1(bytes(text, 'utf8')).digest()
+        ...
+        >>> detector = mwreverts.DigestDetector()
+        >>>
+        >>> detector.process(sha1("aaa"), {'rev_id': 1})
+        >>> detector.process(sha1("bbb"), {'rev_id': 2})
+        >>> detector.process(sha1("aaa"), {'rev_id': 3})
+        Revert(reverting={'rev_id': 3},
+               reverteds=[{'rev_id': 2}],
+               reverted_to={'rev_id': 1})
+        >>> detector.process(sha1("ccc"), {'rev_id': 4})
+    """
+    __slots__ = ('maxsize', 'width', 'seq', 'digests', 'hashes', 'known',
+                 'revisions', 'index', 'mask')
+
+    def __init__(self, radius=defaults.RADIUS, width=20):
+        if radius < 1:
+            raise TypeError("invalid radius. Expected a positive integer.")
+
+        self.maxsize = int(radius) + 1
+        self.width = int(width)
+
+        # The ring.  Position `seq % maxsize` holds revision `seq`.
+        self.digests = bytearray(self.maxsize * self.width)
+        self.hashes = array('q', [0]) * self.maxsize
+        self.known = bytearray(self.maxsize)
+        self.revisions = [None] * self.maxsize
+
+        # The index maps digests to the seq of their most recent occurrence.
+        # It's kept at most half full so that probe sequences stay short.
+        size = 1 << (self.maxsize * 2 - 1).bit_length()
+        self.mask = size - 1
+        self.index = array('q', [EMPTY]) * size
+
+        self.seq = 0
+
+    def reset(self):
+        """
+        Clears the history so that the detector can be re-used for a new page
+        without re-allocating its buffers.
+        """
+        self.index[:] = array('q', [EMPTY]) * len(self.index)
+        self.known[:] = bytes(self.maxsize)
+        self.revisions[:] = [None] * self.maxsize
+        self.seq = 0
+
+    def process(self, checksum, revision=None):
+        """
+        Process a new revision and detect a revert if it occurred.  Note that
+        you can pass whatever you like as `revision` and it will be returned in
+        the case that a revert occurs.
+
+        :Parameters:
+            checksum : bytes | `None`
+                A digest of the revision content.  `None` (or a
+                :class:`mwreverts.DummyChecksum`) represents an unknown
+                checksum that matches nothing.
+            revision : `mixed`
+                Revision metadata.  Note that any data will just be returned
+                in the case of a revert.
+
+        :Returns:
+            a :class:`~mwreverts.Revert` if one occured or `None`
+        """
+        if checksum is None or isinstance(checksum, DummyChecksum):
+            self._insert(None, 0, revision)
+            return None
+        elif len(checksum) != self.width:
+            raise ValueError("invalid checksum. Expected {0} bytes, got {1}."
+                             .format(self.width, len(checksum)))
+
+        revert = None
+        checksum_hash = hash(checksum)
+
+        seq = self.index[self._probe(checksum, checksum_hash)]
+        if seq != EMPTY and self.seq - seq > 1:  # Else noop or no match
+            revisions, maxsize = self.revisions, self.maxsize
+            reverteds = [revisions[i % maxsize]
+                         for i in range(self.seq - 1, seq, -1)]
+            revert = Revert(revision, reverteds, revisions[seq % maxsize])
+
+        self._insert(checksum, checksum_hash, revision)
+        return revert
+
+    def _probe(self, checksum, checksum_hash):
+        # Returns the index slot that holds `checksum` or the empty slot where
+        # it would be inserted.
+        index, mask, hashes = self.index, self.mask, self.hashes
+        maxsize, width = self.maxsize, self.width
+
+        slot = checksum_hash & mask
+        while True:
+            seq = index[slot]
+            if seq == EMPTY:
+                return slot
+            position = seq % maxsize
+            if hashes[position] == checksum_hash and \
+               self.digests.startswith(checksum, position * width):
+                return slot
+            slot = (slot + 1) & mask
+
+    def _insert(self, checksum, checksum_hash, revision):
+        position = self.seq % self.maxsize
+
+        # Evict the oldest revision
+        if self.seq >= self.maxsize and self.known[position]:
+            self._evict(self.seq - self.maxsize)
+
+        # Write the new revision into the ring
+        self.revisions[position] = revision
+        if checksum is None:
+            self.known[position] = 0
+        else:
+            start = position * self.width
+            self.digests[start:start + self.width] = checksum
+            self.hashes[position] = checksum_hash
+            self.known[position] = 1
+            self.index[self._probe(checksum, checksum_hash)] = self.seq
+
+        self.seq += 1
+
+    def _evict(self, seq):
+        # Removes `seq` from the index if it's still the most recent
+        # occurrence of its digest.  Uses backward-shift deletion so that no
+        # tombstones are left behind.
+        index, mask, hashes = self.index, self.mask, self.hashes
+        maxsize = self.maxsize
+
+        slot = hashes[seq % maxsize] & mask
+        while index[slot] != seq:
+            if index[slot] == EMPTY:
+                return  # A more recent occurrence replaced this one
+            slot = (slot + 1) & mask
+
+        hole = slot
+        slot = (slot + 1) & mask
+        while index[slot] != EMPTY:
+            home = hashes[index[slot] % maxsize] & mask
+            if hole <= slot:
+                stays = hole < home <= slot
+            else:
+                stays = home > hole or home <= slot
+            if not stays:
+                index[hole] = index[slot]
+                hole = slot
+            slot = (slot + 1) & mask
+
+        index[hole] = EMPTY
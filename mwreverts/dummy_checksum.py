@@ -19,6 +19,7 @@ class DummyChecksum():
     >>> {"foo", "bar", dummy1, dummy1, dummy2}
     {<#140687347334280>, 'foo', <#140687347334504>, 'bar'}
     """
+    __slots__ = ()
 
     def __str__(self):
         repr(self)
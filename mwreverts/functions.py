@@ -1,22 +1,30 @@
 from . import defaults
+from .arrays import detect_array_reverts, is_array
 from .detector import Detector
 
 
-def detect(checksum_revisions, radius=defaults.RADIUS):
+def detect(checksum_revisions, radius=defaults.RADIUS, revisions=None):
     """
     Detects reverts that occur in a sequence of revisions.  Note that,
     `revision` data meta will simply be returned in the case of a revert.
 
     This function serves as a convenience wrapper around calls to
     :class:`mwreverts.Detector`'s :func:`~mwreverts.Detector.process`
-    method.
+    method.  If `checksum_revisions` is a :class:`numpy.ndarray` of
+    checksums, detection is performed in batch with
+    :func:`mwreverts.detect_array`.
 
     :Parameters:
-        checksum_revisions : `iterable` ( (checksum, revision) )
-            an iterable over tuples of checksum and revision meta data
+        checksum_revisions : `iterable` ( (checksum, revision) ) | `ndarray`
+            an iterable over tuples of checksum and revision meta data or an
+            array of checksums
         radius : int
             a positive integer indicating the maximum revision distance that a
             revert can span.
+        revisions : `sequence` ( `mixed` )
+            revision meta data corresponding to an array of checksums.  If not
+            provided, the positional index of each checksum is used.  Only
+            valid with an array of checksums.
 
     :Return:
         a iterator over :class:`mwreverts.Revert`
@@ -38,6 +46,13 @@ def detect(checksum_revisions, radius=defaults.RADIUS):
 
     """
 
+    if is_array(checksum_revisions):
+        yield from detect_array_reverts(checksum_revisions, radius, revisions)
+        return
+    elif revisions is not None:
+        raise TypeError("revisions can only be provided with an array of " +
+                        "checksums.")
+
     revert_detector = Detector(radius)
 
     for checksum, revision in checksum_revisions:
@@ -0,0 +1,51 @@
+"""
+Checksum functions for identity revert detection.  Each takes the `bytes` of
+a revision's text and returns a checksum.
+
+Identity revert detection doesn't need a cryptographic hash -- it only needs
+distinct texts to have distinct checksums.  A collision between a revision
+and one of the `radius + 1` revisions before it produces a false revert.
+For `n` revisions hashed to `b` bits, the expected number of false reverts
+is roughly ``n * (radius + 1) / 2 ** b``:
+
+* ``sha1`` -- 160 bit `bytes` digests.  Collisions are not a practical
+  concern.  This is the default.
+* ``blake2b`` -- 64 bit `int` digests.  With a radius of 15, the whole
+  history of the English Wikipedia (about 10^9 revisions) is expected to
+  produce about one false revert per 10^9 runs.  Faster to hash, and `int`
+  checksums take less memory in the detector and in sidecars and
+  checkpoints.
+* ``crc32`` -- 32 bit `int` digests.  The fastest, but 10^9 revisions at a
+  radius of 15 are expected to produce a handful of false reverts.  Use it
+  for small wikis or exploratory runs.
+
+.. autodata:: mwreverts.hashers.HASHERS
+
+.. autodata:: mwreverts.hashers.DIGEST_WIDTHS
+"""
+import hashlib
+import zlib
+
+
+def sha1(data):
+    return hashlib.sha1(data).digest()
+
+
+def blake2b(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(),
+                          'little', signed=True)
+
+
+def crc32(data):
+    return zlib.crc32(data)
+
+
+HASHERS = {'sha1': sha1, 'blake2b': blake2b, 'crc32': crc32}
+"""
+Checksum functions by name
+"""
+
+DIGEST_WIDTHS = {'sha1': 20, 'blake2b': 8, 'crc32': 8}
+"""
+The number of bytes needed to store the checksums of each function
+"""
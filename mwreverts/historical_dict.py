@@ -1,21 +1,33 @@
 from collections import deque
+from collections.abc import Sequence
+from itertools import islice
 
 import jsonable
+from jsonable.instance import simple_repr
 
 
 class HistoricalDict(jsonable.Type, dict):
     '''
     A datastructure for efficiently storing and retrieving a
     limited number of records based on keys.
+
+    Every insert is assigned a sequence number.  Keys and values are appended
+    to a pair of logs and each key maps to a queue of the sequence numbers at
+    which it occurs within the window.  This makes insertion, eviction and
+    lookup constant time and allows the values inserted after a key to be
+    sliced directly out of the value log.
     '''
-    __slots__ = ('maxsize', 'history')
+    __slots__ = ('maxsize', 'seq', 'offset', 'key_log', 'value_log')
 
     def initialize(self, maxsize, history=None):
         '''size specifies the maximum amount of history to keep'''
         super().__init__()
 
         self.maxsize = int(maxsize)
-        self.history = deque(maxlen=self.maxsize)  # Preserves order history
+        self.seq = 0  # The sequence number of the next insert
+        self.offset = 0  # The sequence number of key_log[0]/value_log[0]
+        self.key_log = []
+        self.value_log = []
 
         # If `items` are specified, then initialize with them
         if history is not None:
@@ -28,48 +40,137 @@ class HistoricalDict(jsonable.Type, dict):
     def insert(self, key, value):
         '''Adds a new key-value pair. Returns any discarded values.'''
 
-        # Add to history and catch expectorate
-        if len(self.history) == self.maxsize:
-            expectorate = self.history[0]
+        # Catch expectorate
+        if self.seq >= self.maxsize:
+            index = self.seq - self.maxsize - self.offset
+            old_key, old_value = self.key_log[index], self.value_log[index]
+            positions = super().__getitem__(old_key)
+            positions.popleft()
+            if len(positions) == 0:
+                super().__delitem__(old_key)
+            expectorate = (old_key, old_value)
         else:
             expectorate = None
 
-        self.history.append((key, value))
+        # Compact the logs once they hold twice the window.  New lists are
+        # built rather than trimmed in place so that any outstanding slice
+        # of the old logs stays valid.
+        if len(self.key_log) >= self.maxsize * 2:
+            self.key_log = self.key_log[-self.maxsize:]
+            self.value_log = self.value_log[-self.maxsize:]
+            self.offset = self.seq - len(self.key_log)
 
-        # Add to the appropriate list of values
+        self.key_log.append(key)
+        self.value_log.append(value)
+
+        # Add to the appropriate queue of positions
         if key in self:
-            super().__getitem__(key).append(value)
+            super().__getitem__(key).append(self.seq)
         else:
-            super().__setitem__(key, [value])
+            super().__setitem__(key, deque([self.seq]))
 
-        # Clean up old values
-        if expectorate is not None:
-            old_key, old_value = expectorate
-            super().__getitem__(old_key).pop(0)
-            if len(super().__getitem__(old_key)) == 0:
-                super().__delitem__(old_key)
+        self.seq += 1
 
-            return (old_key, old_value)
+        return expectorate
 
     def __getitem__(self, key):
         if key in self:
-            return super().__getitem__(key)[-1]
+            return self.value_log[super().__getitem__(key)[-1] - self.offset]
         else:
             raise KeyError(key)
 
+    def since(self, key, lazy=False):
+        '''
+        Gets the values inserted after the most recent occurrence of a key
+        (most recent first).  If `lazy`, a :class:`HistorySlice` is returned
+        rather than a `list`.
+        '''
+        if key in self:
+            start = super().__getitem__(key)[-1] + 1 - self.offset
+        else:
+            start = max(self.seq - self.maxsize, 0) - self.offset
+
+        if lazy:
+            return HistorySlice(self.value_log, start, len(self.value_log))
+        else:
+            return self.value_log[start:][::-1]
+
     def up_to(self, key):
         '''Gets the recently inserted values up to a key'''
-        for okey, ovalue in reversed(self.history):
-            if okey == key:
-                break
-            else:
-                yield ovalue
+        if key in self:
+            n = self.seq - 1 - super().__getitem__(key)[-1]
+        else:
+            n = min(self.seq, self.maxsize)
+
+        return islice(reversed(self.value_log), n)
+
+    @property
+    def history(self):
+        '''The (key, value) pairs in the window (ordered chronologically)'''
+        start = max(self.seq - self.maxsize, 0) - self.offset
+        return list(zip(self.key_log[start:], self.value_log[start:]))
 
     def last(self):
-        return self.history[-1]
+        return (self.key_log[-1], self.value_log[-1])
+
+    def to_json(self):
+        return {'maxsize': self.maxsize,
+                'history': jsonable.to_json(self.history)}
+
+    def __repr__(self):
+        return simple_repr(self.__class__.__name__,
+                           ordered_kwargs=[('maxsize', self.maxsize),
+                                           ('history', self.history)])
 
     def __eq__(self, other):
         if not hasattr(other, "history"):
             return False
         else:
             return self.history == other.history
+
+
+class HistorySlice(Sequence):
+    '''
+    A lazy view of a range of a :class:`HistoricalDict`'s value log (most
+    recent first).  The range is copied into a `list` the first time the
+    values are accessed, compared or serialized.  This is safe because the
+    logs are only ever appended to or replaced, never modified in place.
+    '''
+    __slots__ = ('log', 'start', 'stop', 'values')
+
+    def __init__(self, log, start, stop):
+        self.log = log
+        self.start = start
+        self.stop = stop
+        self.values = None
+
+    def materialize(self):
+        '''Gets the values as a `list`.'''
+        if self.values is None:
+            self.values = self.log[self.start:self.stop][::-1]
+            self.log = None  # Let go of the log
+        return self.values
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        return self.materialize()[index]
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence):
+            return self.materialize() == list(other)
+        else:
+            return NotImplemented
+
+    def __repr__(self):
+        return repr(self.materialize())
+
+    def __reduce__(self):
+        return (list, (self.materialize(),))
+
+    def to_json(self):
+        return jsonable.to_json(self.materialize())
@@ -0,0 +1,61 @@
+class Interner():
+    """
+    Maps checksums to compact integer ids so that a history window can be
+    keyed by small ints rather than whatever checksum objects were provided
+    (base36/hex strings, `bytes` digests, etc.).  Ids are released when a
+    checksum leaves the window and re-used, so the number of ids in use never
+    exceeds the size of the window.
+
+    Unknown checksums (`None`) are each assigned a fresh id from a sentinel
+    range of negative integers.  Like :class:`mwreverts.DummyChecksum`, these
+    ids never match anything but themselves.
+
+    >>> from mwreverts.interner import Interner
+    >>> interner = Interner()
+    >>> interner.intern("aaa"), interner.intern("bbb"), interner.intern("aaa")
+    (0, 1, 0)
+    >>> interner.intern(None), interner.intern(None)
+    (-1, -2)
+    """
+    __slots__ = ('ids', 'checksums', 'free', 'unknowns')
+
+    def __init__(self):
+        self.ids = {}
+        self.checksums = []
+        self.free = []
+        self.unknowns = 0
+
+    def intern(self, checksum):
+        '''Gets the id of a checksum, assigning a new one if necessary.'''
+        if checksum is None:
+            self.unknowns += 1
+            return -self.unknowns
+
+        id = self.ids.get(checksum)
+        if id is None:
+            if self.free:
+                id = self.free.pop()
+                self.checksums[id] = checksum
+            else:
+                id = len(self.checksums)
+                self.checksums.append(checksum)
+            self.ids[checksum] = id
+
+        return id
+
+    def release(self, id):
+        '''Forgets the checksum assigned to an id so the id can be re-used.'''
+        if id >= 0:
+            del self.ids[self.checksums[id]]
+            self.checksums[id] = None
+            self.free.append(id)
+
+    def checksum(self, id):
+        '''Gets the checksum assigned to an id (`None` for unknowns).'''
+        if id >= 0:
+            return self.checksums[id]
+        else:
+            return None
+
+    def __len__(self):
+        return len(self.ids)
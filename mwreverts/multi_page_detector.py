@@ -0,0 +1,116 @@
+from collections import OrderedDict
+
+from . import defaults
+from .detector import Detector
+
+
+class MultiPageDetector:
+    """
+    Detects revert events in a chronological stream of revisions that
+    interleaves many pages (e.g. recent changes).  A bounded
+    :class:`mwreverts.Detector` is kept per page.  Inactive pages are evicted
+    in least-recently-used order whenever more than `max_pages` pages or
+    more than `max_revisions` revisions are held.  Note that a revert that
+    spans an eviction will not be detected.
+
+    :Parameters:
+        radius : int
+            a positive integer indicating the maximum revision distance that a
+            revert can span.
+        max_pages : int
+            the maximum number of pages to keep state for.  If `None`, no
+            limit is applied.
+        max_revisions : int
+            the maximum number of revisions to keep across all page
+            histories.  If `None`, no limit is applied.
+        intern : bool
+            passed to each :class:`mwreverts.Detector`
+        on_evict : `func`
+            called with `(page_id, detector)` whenever a page is evicted
+
+    :Example:
+        >>> import mwreverts
+        >>> detector = mwreverts.MultiPageDetector(max_pages=1000)
+        >>>
+        >>> detector.process(10, "aaa", {'rev_id': 1})
+        >>> detector.process(20, "aaa", {'rev_id': 2})
+        >>> detector.process(10, "bbb", {'rev_id': 3})
+        >>> detector.process(10, "aaa", {'rev_id': 4})
+        Revert(reverting={'rev_id': 4},
+               reverteds=[{'rev_id': 3}],
+               reverted_to={'rev_id': 1})
+    """
+
+    def __init__(self, radius=defaults.RADIUS, max_pages=None,
+                 max_revisions=None, intern=False, on_evict=None):
+        if radius < 1:
+            raise TypeError("invalid radius. Expected a positive integer.")
+
+        self.radius = int(radius)
+        self.max_pages = int(max_pages) if max_pages is not None else None
+        self.max_revisions = int(max_revisions) \
+            if max_revisions is not None else None
+        self.intern = bool(intern)
+        self.on_evict = on_evict
+
+        self.detectors = OrderedDict()  # Least recently used first
+        self.revisions = 0  # Revisions held across all page histories
+        self.evicted = 0
+
+    def process(self, page_id, checksum, revision=None):
+        """
+        Process a new revision of a page and detect a revert if it occurred.
+
+        :Parameters:
+            page_id : `hashable`
+                Identifies the page that the revision belongs to
+            checksum : str
+                Any identity-machable string-based hash of revision content
+            revision : `mixed`
+                Revision metadata.  Note that any data will just be returned
+                in the case of a revert.
+
+        :Returns:
+            a :class:`~mwreverts.Revert` if one occured or `None`
+        """
+        detector = self.detectors.get(page_id)
+        if detector is None:
+            detector = Detector(self.radius, intern=self.intern)
+            self.detectors[page_id] = detector
+        else:
+            self.detectors.move_to_end(page_id)
+
+        if detector.seq < detector.maxsize:
+            self.revisions += 1  # Else a revision was expectorated
+
+        revert = detector.process(checksum, revision)
+
+        while (len(self.detectors) > 1 and
+               ((self.max_pages is not None and
+                 len(self.detectors) > self.max_pages) or
+                (self.max_revisions is not None and
+                 self.revisions > self.max_revisions))):
+            self.evict()
+
+        return revert
+
+    def evict(self):
+        """
+        Evicts the least recently active page.
+
+        :Returns:
+            the `(page_id, detector)` that was evicted
+        """
+        page_id, detector = self.detectors.popitem(last=False)
+        self.revisions -= min(detector.seq, detector.maxsize)
+        self.evicted += 1
+        if self.on_evict is not None:
+            self.on_evict(page_id, detector)
+
+        return page_id, detector
+
+    def __contains__(self, page_id):
+        return page_id in self.detectors
+
+    def __len__(self):
+        return len(self.detectors)
@@ -6,7 +6,8 @@ router = mwcli.Router(
         " MediaWiki projects.",
     {'dump2reverts': "Extracts reverts from historical XML dumps",
      'revdocs2reverts': "Extracts reverts from page-partitioned revision " +
-                        "documents."}
+                        "documents.",
+     'sidecar2reverts': "Extracts reverts from sidecar checksum files."}
 )
 
 main = router.main
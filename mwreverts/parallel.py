@@ -0,0 +1,198 @@
+"""
+This module provides process-parallel revert detection across pages.  Since
+reverts never span pages, each page's history can be processed
+independently in a pool of processes.
+
+Long histories can also be split into chunks that are processed in parallel
+(see :func:`~mwreverts.parallel.chunk_history`).  A
+:class:`~mwreverts.Detector` only remembers the last `radius + 1` revisions,
+so a chunk that is preceded by the `radius + 1` revisions before it detects
+exactly the reverts that a single detector would.
+
+.. autofunction:: mwreverts.parallel.detect_pages
+
+.. autofunction:: mwreverts.parallel.map_pages
+
+.. autofunction:: mwreverts.parallel.chunk_history
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from multiprocessing import cpu_count
+
+from . import defaults
+from .detector import Detector
+from .functions import detect
+
+IN_FLIGHT_PER_WORKER = 2
+"""
+The default number of pages per worker that may be queued or processing
+"""
+
+
+def detect_pages(page_iter, radius=defaults.RADIUS, workers=None,
+                 ordered=True, max_in_flight=None, chunk_size=None):
+    """
+    Detects reverts in a sequence of pages using a pool of processes.
+
+    :Parameters:
+        page_iter : `iterable` ( `iterable` ( (checksum, revision) ) )
+            an iterable over pages where each page is an iterable of
+            (checksum, revision) pairs.  Checksums and revisions must be
+            :mod:`pickle`-able.
+        radius : int | `iterable` ( int )
+            a positive integer indicating the maximum revision distance that a
+            revert can span (or several, see :class:`mwreverts.Detector`).
+        workers : int
+            the number of processes to use [default: <cpu_count>]
+        ordered : bool
+            if True, reverts are returned in the original page order.
+            Otherwise, reverts of each page are returned as soon as the page
+            is processed.
+        max_in_flight : int
+            the maximum number of pages that can be queued or processing at
+            once.  This bounds memory use.  [default: 2 * workers]
+        chunk_size : int
+            if set, pages are split into chunks of this many revisions that
+            are processed in parallel (see
+            :func:`~mwreverts.parallel.chunk_history`).  The reverts are the
+            same as without chunking.  `max_in_flight` then counts chunks.
+
+    :Returns:
+        an iterator over :class:`mwreverts.Revert`
+
+    :Example:
+        >>> from mwreverts.parallel import detect_pages
+        >>>
+        >>> pages = [
+        ...     [("aaa", {'rev_id': 1}), ("bbb", {'rev_id': 2}),
+        ...      ("aaa", {'rev_id': 3})],
+        ...     [("ccc", {'rev_id': 4}), ("ddd", {'rev_id': 5}),
+        ...      ("ccc", {'rev_id': 6})]
+        ... ]
+        >>> for revert in detect_pages(pages, workers=2):
+        ...     print(revert.reverting)
+        ...
+        {'rev_id': 3}
+        {'rev_id': 6}
+    """
+    radii = [radius] if isinstance(radius, int) else list(radius)
+    if len(radii) == 0 or any(radius < 1 for radius in radii):
+        raise TypeError("invalid radius. Expected a positive integer.")
+    if not isinstance(radius, int):
+        radius = radii
+
+    if chunk_size is None:
+        process_page = partial(_detect_page, radius=radius)
+        page_iter = (list(page) for page in page_iter)
+    else:
+        process_page = partial(_detect_chunk, radius=radius)
+        page_iter = (chunk for page in page_iter
+                     for chunk in chunk_history(page, radius, chunk_size))
+
+    for reverts in map_pages(process_page, page_iter, workers=workers,
+                             ordered=ordered, max_in_flight=max_in_flight):
+        yield from reverts
+
+
+def map_pages(process_page, pages, workers=None, ordered=True,
+              max_in_flight=None):
+    """
+    Applies `process_page` to each page in a pool of processes and generates
+    the results.
+
+    :Parameters:
+        process_page : `func`
+            a :mod:`pickle`-able function that takes a page and returns a
+            :mod:`pickle`-able result
+        pages : `iterable`
+            the pages to process.  Each page is sent to a worker as is, so
+            it must be :mod:`pickle`-able (e.g. a `list` or `tuple` rather
+            than a generator).
+        workers : int
+            the number of processes to use [default: <cpu_count>]
+        ordered : bool
+            if True, results are generated in the order of `pages`
+        max_in_flight : int
+            the maximum number of pages that can be queued or processing at
+            once [default: 2 * workers]
+    """
+    workers = int(workers or cpu_count())
+    max_in_flight = int(max_in_flight or workers * IN_FLIGHT_PER_WORKER)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque() if ordered else set()
+        for page in pages:
+            future = executor.submit(process_page, page)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+
+            if len(pending) >= max_in_flight:
+                yield from _collect(pending, ordered)
+
+        while pending:
+            yield from _collect(pending, ordered)
+
+
+def chunk_history(revisions, radius, chunk_size):
+    """
+    Splits a page's history into chunks of `chunk_size` revisions.  Each
+    chunk after the first is preceded by the `radius + 1` revisions before
+    it, so detecting reverts over a chunk and keeping only the reverts of the
+    chunk's own revisions gives the same result as a single detector over the
+    whole history.
+
+    :Parameters:
+        revisions : `iterable`
+            a page's history in order
+        radius : int | `iterable` ( int )
+            the radius (or radii) of detection
+        chunk_size : int
+            the number of new revisions per chunk
+
+    :Returns:
+        an iterator over (overlap, revisions) pairs where the first `overlap`
+        revisions of each chunk only seed the detector
+    """
+    if chunk_size < 1:
+        raise TypeError("invalid chunk_size. Expected a positive integer.")
+    window = (radius if isinstance(radius, int) else max(radius)) + 1
+
+    overlap, chunk = 0, []
+    for revision in revisions:
+        chunk.append(revision)
+        if len(chunk) - overlap >= chunk_size:
+            yield overlap, chunk
+            chunk = chunk[-window:]
+            overlap = len(chunk)
+
+    if len(chunk) > overlap:
+        yield overlap, chunk
+
+
+def _collect(pending, ordered):
+    # Waits for (at least) one page and generates the results
+    if ordered:
+        yield pending.popleft().result()
+    else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+            yield future.result()
+
+
+def _detect_page(checksum_revisions, radius):
+    return list(detect(checksum_revisions, radius=radius))
+
+
+def _detect_chunk(chunk, radius):
+    overlap, checksum_revisions = chunk
+    detector = Detector(radius)
+    reverts = []
+    for i, (checksum, revision) in enumerate(checksum_revisions):
+        revert = detector.process(checksum, revision)
+        if revert is not None and i >= overlap:
+            reverts.append(revert)
+    return reverts
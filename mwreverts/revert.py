@@ -1,5 +1,7 @@
 import jsonable
 
+from .historical_dict import HistorySlice
+
 
 class Revert(jsonable.Type):
     """
@@ -13,16 +15,26 @@ class Revert(jsonable.Type):
             The reverting revision data : `mixed`
         **reverteds**
             The reverted revision data (ordered chronologically) :
-            list( `mixed` )
+            list( `mixed` ) -- or a lazy
+            :class:`~mwreverts.historical_dict.HistorySlice` that behaves like
+            one if produced by a lazy :class:`mwreverts.Detector`
         **reverted_to**
             The reverted-to revision data : `mixed`
+        **radius**
+            The smallest radius that detects the revert if it was detected
+            by a multi-radius :class:`mwreverts.Detector` : `int` | `None`
     """
-    __slots__ = ('reverting', 'reverteds', 'reverted_to')
+    __slots__ = ('reverting', 'reverteds', 'reverted_to', 'radius')
 
-    def initialize(self, reverting=None, reverteds=None, reverted_to=None):
+    def initialize(self, reverting=None, reverteds=None, reverted_to=None,
+                   radius=None):
         self.reverting = reverting
-        self.reverteds = list(reverteds or [])
+        if isinstance(reverteds, HistorySlice):
+            self.reverteds = reverteds
+        else:
+            self.reverteds = list(reverteds or [])
         self.reverted_to = reverted_to
+        self.radius = radius
 
     def __iter__(self):
         yield self.reverting
@@ -33,6 +45,13 @@ class Revert(jsonable.Type):
         if isinstance(other, tuple):
             return tuple(self) == other
 
+    def __repr__(self):
+        args = "reverting={0!r}, reverteds={1!r}, reverted_to={2!r}" \
+            .format(self.reverting, self.reverteds, self.reverted_to)
+        if self.radius is not None:
+            args += ", radius={0!r}".format(self.radius)
+        return "{0}({1})".format(self.__class__.__name__, args)
+
     def __getitem__(self, index):
         if index == 0:
             return self.reverting
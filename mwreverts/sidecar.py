@@ -0,0 +1,181 @@
+"""
+This module reads and writes sidecar checksum files.  A sidecar records the
+page, rev_id, timestamp and checksum digest of every revision that is
+processed so that detection can be re-run (e.g. with a different radius)
+without re-reading and re-hashing revision text.
+
+A sidecar is a sequence of page blocks laid out as follows (all integers are
+little-endian):
+
+* block header -- `struct` ``<4sqI``: magic, page_id and the number of
+  records in the block.  The magic is ``b"MWS1"`` for 20 byte digests and
+  ``b"MWS8"`` for 8 byte digests.
+* records -- `struct` ``<qqB20s`` (or ``<qqB8s``) per revision: rev_id, unix
+  timestamp (-1 when missing), 1 if the checksum is known (else 0) and the
+  digest
+
+Each page block is written with a single call to `write()`, so several
+processes can append pages to the same file.  Compressed sidecars are
+written as one gzip member (or bz2 stream) per page block, which standard
+readers decompress as a single file.
+
+.. autofunction:: mwreverts.sidecar.read
+
+.. autoclass:: mwreverts.sidecar.Writer
+    :members:
+
+.. autofunction:: mwreverts.sidecar.digest
+"""
+import bz2
+import gzip
+import hashlib
+import struct
+
+from mwtypes import Timestamp
+
+BLOCK = struct.Struct("<4sqI")
+MAGICS = {20: b"MWS1", 8: b"MWS8"}
+WIDTHS = {magic: width for width, magic in MAGICS.items()}
+RECORDS = {width: struct.Struct("<qqB{0}s".format(width)) for width in MAGICS}
+WIDTH = 20
+
+MISSING = -1
+
+COMPRESSORS = {'gz': gzip.compress, 'bz2': bz2.compress}
+
+
+def digest(checksum, width=WIDTH):
+    """
+    Converts a checksum into a digest of `width` bytes.  A checksum of
+    `width` bytes is used as-is and `int` checksums (see
+    :mod:`mwreverts.hashers`) are stored as signed 64-bit integers.  Other
+    checksums are hashed with BLAKE2b so that equal checksums produce equal
+    digests.
+
+    :Parameters:
+        checksum : `bytes` | `str` | `int` | `None`
+            a checksum
+        width : `int`
+            20 or 8
+
+    :Returns:
+        `bytes` or `None` if the checksum is unknown
+    """
+    if checksum is None:
+        return None
+    elif isinstance(checksum, int):
+        return checksum.to_bytes(8, 'little', signed=True).ljust(width, b"\0")
+    elif isinstance(checksum, bytes) and len(checksum) == width:
+        return checksum
+    elif isinstance(checksum, str):
+        checksum = bytes(checksum, 'utf8', 'replace')
+
+    return hashlib.blake2b(checksum, digest_size=width).digest()
+
+
+class Writer:
+    """
+    Writes page blocks to a sidecar file.
+
+    :Parameters:
+        f : `file`
+            a binary file to write to.  Open it in append mode to share it
+            between processes.
+        compress : `str`
+            If set, each page block is compressed in this format ("gz" or
+            "bz2")
+        width : `int`
+            The width of digests: 20 or 8 bytes.  8 bytes suffices for the
+            `int` checksums of :mod:`mwreverts.hashers`.
+    """
+    def __init__(self, f, compress=None, width=WIDTH):
+        if width not in MAGICS:
+            raise ValueError("Unsupported digest width {0}".format(width))
+        self.f = f
+        self.compress = COMPRESSORS[compress] if compress is not None \
+            else None
+        self.width = width
+        self.record = RECORDS[width]
+        self.no_digest = bytes(width)
+
+    @classmethod
+    def from_path(cls, path, width=WIDTH):
+        """
+        Opens a sidecar for appending.  Paths ending in ".gz" or ".bz2" are
+        compressed accordingly.
+        """
+        extension = path.rsplit(".", 1)[-1]
+        return cls(open(path, "ab"),
+                   compress=extension if extension in COMPRESSORS else None,
+                   width=width)
+
+    def write_page(self, page_id, records):
+        """
+        Writes a page block.
+
+        :Parameters:
+            page_id : `int`
+                the page's identifier
+            records : `iterable` ( (rev_id, timestamp, checksum) )
+                the revisions of the page in the order they were processed.
+                `timestamp` can be anything that :class:`mwtypes.Timestamp`
+                accepts (or `None`).  `checksum` is converted with
+                :func:`~mwreverts.sidecar.digest`.
+        """
+        data = [b""]
+        for rev_id, timestamp, checksum in records:
+            rev_digest = digest(checksum, self.width)
+            data.append(self.record.pack(
+                rev_id if rev_id is not None else MISSING,
+                Timestamp(timestamp).unix() if timestamp is not None
+                else MISSING,
+                rev_digest is not None,
+                rev_digest or self.no_digest))
+
+        data[0] = BLOCK.pack(MAGICS[self.width], page_id, len(data) - 1)
+        block = b"".join(data)
+        if self.compress is not None:
+            block = self.compress(block)
+        self.f.write(block)
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def read(f):
+    """
+    Reads the page blocks of a sidecar file.
+
+    :Parameters:
+        f : `file`
+            a binary file
+
+    :Returns:
+        An iterator over (page_id, records) pairs where `records` is a `list`
+        of (rev_id, unix timestamp, digest).  Missing values are `None`.
+    """
+    while True:
+        header = f.read(BLOCK.size)
+        if len(header) == 0:
+            break
+        elif len(header) < BLOCK.size:
+            raise ValueError("Truncated sidecar block header")
+
+        magic, page_id, n = BLOCK.unpack(header)
+        if magic not in WIDTHS:
+            raise ValueError("Not a sidecar block: {0}".format(repr(magic)))
+        record = RECORDS[WIDTHS[magic]]
+
+        data = f.read(record.size * n)
+        if len(data) < record.size * n:
+            raise ValueError("Truncated sidecar block for page {0}"
+                             .format(page_id))
+
+        records = [(rev_id if rev_id != MISSING else None,
+                    timestamp if timestamp != MISSING else None,
+                    rev_digest if known else None)
+                   for rev_id, timestamp, known, rev_digest
+                   in record.iter_unpack(data)]
+
+        yield page_id, records
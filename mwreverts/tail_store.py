@@ -0,0 +1,132 @@
+"""
+This module provides a persistent store of the tail of each page's history
+(the last radius + 1 checksums and revisions) so that revert detection can
+resume where a previous run left off rather than reprocessing the whole
+history.  Tails are stored in a local SQLite file as
+:mod:`mwreverts.checkpoint` blobs alongside the JSON revision documents they
+reference.  The checkpoint holds the checksum of each revision, so revision
+text is not stored.
+
+The database is opened in write-ahead logging mode and each page is
+committed as it is saved so that several processes can share a store.
+
+.. autoclass:: mwreverts.tail_store.TailStore
+    :members:
+"""
+import json
+import sqlite3
+
+from .checkpoint import dumps, loads
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tail (
+    page_id INTEGER PRIMARY KEY,
+    radius INTEGER NOT NULL,
+    last_timestamp TEXT,
+    last_id INTEGER,
+    checkpoint BLOB NOT NULL,
+    revisions TEXT NOT NULL,
+    checksum_kind TEXT
+)
+"""
+
+
+class TailStore:
+    """
+    Stores the detector state of pages between runs.
+
+    :Parameters:
+        path : `str`
+            the path to a SQLite database file (created if it does not exist)
+        commit_every : int
+            the number of saved pages between commits.  Writers block each
+            other while a transaction is open, so this should be small when
+            the store is shared.
+        drop_fields : `iterable` ( `str` )
+            the fields of revision documents that are not stored
+    """
+
+    def __init__(self, path, commit_every=1, drop_fields=('text',)):
+        self.path = path
+        self.commit_every = int(commit_every)
+        self.drop_fields = frozenset(drop_fields)
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(SCHEMA)
+        columns = [row[1] for row in
+                   self.conn.execute("PRAGMA table_info(tail)")]
+        if 'checksum_kind' not in columns:
+            # Tails stored before checksum kinds were recorded never match
+            self.conn.execute("ALTER TABLE tail ADD COLUMN checksum_kind TEXT")
+        self.conn.commit()
+        self.unsaved = 0
+
+    def load(self, page_id):
+        """
+        Loads the stored state of a page.
+
+        :Returns:
+            A tuple of `(radius, detector, last, checksum_kind)` where
+            `last` is the `(timestamp, id)` of the last processed revision,
+            or `None` if the page is not in the store.
+        """
+        row = self.conn.execute(
+            "SELECT radius, last_timestamp, last_id, checkpoint, revisions, " +
+            "checksum_kind FROM tail WHERE page_id = ?",
+            (page_id,)).fetchone()
+        if row is None:
+            return None
+
+        radius, last_timestamp, last_id, checkpoint, revisions, \
+            checksum_kind = row
+        revisions = json.loads(revisions)
+        detector = loads(checkpoint, resolve=revisions.__getitem__)
+        return radius, detector, (last_timestamp, last_id), checksum_kind
+
+    def save(self, page_id, radius, detector, last, checksum_kind=None):
+        """
+        Saves the state of a page, replacing any stored state.
+
+        :Parameters:
+            page_id : int
+                the page's identifier
+            radius : int
+                the radius that `detector` was constructed with
+            detector : :class:`mwreverts.Detector`
+                the detector that processed the page's revisions
+            last : ( `str`, int )
+                the `(timestamp, id)` of the last processed revision
+            checksum_kind : `str`
+                identifies how the checksums were produced (e.g. the name of
+                a hash function).  A tail can only seed a detector that is
+                fed the same kind of checksums.
+        """
+        revisions = []
+
+        def handle(revision):
+            if isinstance(revision, dict):
+                revision = {field: value for field, value in revision.items()
+                            if field not in self.drop_fields}
+            revisions.append(revision)
+            return len(revisions) - 1
+
+        checkpoint = dumps(detector, handle=handle)
+        last_timestamp, last_id = last
+        self.conn.execute(
+            "INSERT OR REPLACE INTO tail (page_id, radius, last_timestamp, " +
+            "last_id, checkpoint, revisions, checksum_kind) " +
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (page_id, radius, last_timestamp, last_id, checkpoint,
+             json.dumps(revisions), checksum_kind))
+
+        self.unsaved += 1
+        if self.unsaved >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self.unsaved = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -0,0 +1,53 @@
+from random import Random
+
+from nose import SkipTest
+from nose.tools import eq_
+
+from ..detector import Detector
+from ..functions import detect
+
+try:
+    import numpy
+except ImportError:
+    raise SkipTest("numpy is not installed")
+
+from ..arrays import detect_array  # noqa
+
+
+def test_detect_array():
+    checksums = numpy.array([1, 2, 3, 1, 4, 2, 1])
+
+    reverting, reverted_start, reverted_end, reverted_to = \
+        detect_array(checksums, radius=2)
+
+    eq_(reverting.tolist(), [3, 6])
+    eq_(reverted_start.tolist(), [1, 4])
+    eq_(reverted_end.tolist(), [3, 6])
+    eq_(reverted_to.tolist(), [0, 3])
+
+
+def test_detect_with_array():
+    checksums = numpy.array([1, 2, 3, 1, 4, 2, 1])
+    revisions = [{'id': i} for i in range(1, 8)]
+
+    expected = [
+        ({'id': 4}, [{'id': 3}, {'id': 2}], {'id': 1}),
+        ({'id': 7}, [{'id': 6}, {'id': 5}], {'id': 4})
+    ]
+    eq_(list(detect(checksums, radius=2, revisions=revisions)), expected)
+
+
+def test_matches_detector():
+    random = Random(0)
+    for radius in (1, 2, 5, 15):
+        checksums = [random.randint(0, 8) for _ in range(1000)]
+
+        detector = Detector(radius)
+        expected = [tuple(detector.process(c, i) or ())
+                    for i, c in enumerate(checksums)]
+        expected = [revert for revert in expected if revert]
+
+        eq_([tuple(revert) for revert in
+             detect(numpy.array(checksums, dtype=numpy.uint64),
+                    radius=radius)],
+            expected)
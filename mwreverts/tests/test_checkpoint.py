@@ -0,0 +1,72 @@
+import hashlib
+
+from nose.tools import eq_, raises
+
+from ..checkpoint import dumps, loads
+from ..detector import Detector
+from ..digest_detector import DigestDetector
+
+
+def sha1(value):
+    return hashlib.sha1(bytes(str(value), 'utf8')).digest()
+
+
+def test_detector():
+    detector = Detector(3)
+    for rev_id, checksum in enumerate(["a", "b", "c", "b", "d"]):
+        detector.process(checksum, rev_id)
+
+    restored = loads(dumps(detector))
+    eq_(restored.history, detector.history)
+    eq_(tuple(restored.process("b", 5)), (5, [4], 3))
+
+
+def test_radii():
+    detector = Detector([1, 3])
+    for rev_id, checksum in enumerate(["a", "b", "c", "d"]):
+        detector.process(checksum, rev_id)
+
+    restored = loads(dumps(detector))
+    eq_(restored.radii, [1, 3])
+    eq_(restored.process("a", 4).radius, 3)
+
+
+def test_interned_detector():
+    detector = Detector(3, intern=True)
+    for rev_id, checksum in enumerate([sha1("a"), None, sha1("b")]):
+        detector.process(checksum, {'id': rev_id})
+
+    restored = loads(dumps(detector, handle=lambda r: r['id']),
+                     resolve=lambda h: {'id': h})
+    assert restored.interner is not None
+    eq_(tuple(restored.process(sha1("a"), {'id': 3})),
+        ({'id': 3}, [{'id': 2}, {'id': 1}], {'id': 0}))
+
+
+def test_digest_detector():
+    detector = DigestDetector(2)
+    for rev_id, value in enumerate(["a", "b", "c", None, "d"]):
+        detector.process(sha1(value) if value else None, rev_id)
+
+    restored = loads(dumps(detector))
+    assert isinstance(restored, DigestDetector)
+    eq_(restored.process(sha1("b"), 5), None)  # Out of the window
+    eq_(tuple(restored.process(sha1("d"), 6)), (6, [5], 4))
+
+
+@raises(ValueError)
+def test_varying_width():
+    detector = Detector(3)
+    detector.process("a", 1)
+    detector.process("bb", 2)
+    dumps(detector)
+
+
+def test_int_checksums():
+    detector = Detector(3)
+    for rev_id, checksum in enumerate([-5, 2 ** 40, 3, 7]):
+        detector.process(checksum, rev_id)
+
+    restored = loads(dumps(detector))
+    eq_(restored.history, detector.history)
+    eq_(tuple(restored.process(2 ** 40, 4)), (4, [3, 2], 1))
@@ -0,0 +1,62 @@
+import io
+import json
+import os
+import tempfile
+
+from nose import SkipTest
+from nose.tools import eq_
+
+from ..utilities.columnar import NPZWriter
+from ..utilities.revdocs2reverts import streamer
+from .test_revdocs2reverts import REV_DOCS
+
+try:
+    import numpy
+except ImportError:
+    raise SkipTest("numpy is not installed")
+
+
+def test_npz_writer():
+    page = {'id': 10, 'title': "Foo"}
+    f = io.BytesIO()
+    writer = NPZWriter(f)
+    writer.write({
+        'reverting': {'id': 3, 'timestamp': "1970-01-01T00:00:03Z",
+                      'page': page},
+        'reverteds': [{'id': 2}],
+        'reverted_to': {'id': 1, 'timestamp': "1970-01-01T00:00:01Z"}})
+    writer.write({
+        'reverting': {'id': 6, 'page': page},
+        'reverteds': [{'id': 5}, {'id': 4}],
+        'reverted_to': {'id': 3}})
+    writer.close()
+
+    f.seek(0)
+    reverts = numpy.load(f)
+    eq_(reverts['page_id'].tolist(), [10, 10])
+    eq_(reverts['reverting_id'].tolist(), [3, 6])
+    eq_(reverts['reverting_timestamp'].tolist(), [3, -1])
+    eq_(reverts['reverted_to_id'].tolist(), [1, 3])
+    eq_(reverts['reverted_to_timestamp'].tolist(), [1, -1])
+    eq_(reverts['reverted_count'].tolist(), [1, 2])
+    eq_(reverts['reverted_offsets'].tolist(), [0, 1, 3])
+    eq_(reverts['reverted_ids'].tolist(), [2, 5, 4])
+
+
+def test_fields():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "revdocs.json")
+        with open(path, "w") as f:
+            f.write("".join(json.dumps(rev_doc) + "\n"
+                            for rev_doc in REV_DOCS))
+
+        output_dir = os.path.join(directory, "output")
+        os.mkdir(output_dir)
+        streamer.main([path, "--radius=2", "--fields=timestamp,comment",
+                       "--format=npz", "--output=" + output_dir])
+
+        output_path, = os.listdir(output_dir)
+        reverts = numpy.load(os.path.join(output_dir, output_path))
+        eq_(reverts['page_id'].tolist(), [1, 1])
+        eq_(reverts['reverting_id'].tolist(), [3, 5])
+        eq_(reverts['reverted_ids'].tolist(), [2, 4])
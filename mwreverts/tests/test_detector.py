@@ -1,3 +1,5 @@
+from random import Random
+
 from nose.tools import eq_
 
 from ..detector import Detector
@@ -31,3 +33,80 @@ def test_detector():
     eq_(detector.process("f", {'id': 9}), None)
     eq_(detector.process("g", {'id': 10}), None)
     eq_(detector.process("a", {'id': 11}), None)
+
+
+def reference_detect(checksums, radius):
+    # A direct transcription of the definition of an identity revert
+    for i, checksum in enumerate(checksums):
+        window = checksums[max(i - radius - 1, 0):i]
+        if checksum in window:
+            j = i - len(window) + \
+                max(k for k, c in enumerate(window) if c == checksum)
+            if i - j > 1:
+                yield (i, list(range(i - 1, j, -1)), j)
+
+
+def test_detector_matches_reference():
+    random = Random(0)
+    for radius in (1, 2, 5, 15):
+        checksums = [random.randint(0, 6) for _ in range(500)]
+
+        detector = Detector(radius)
+        reverts = []
+        for i, checksum in enumerate(checksums):
+            revert = detector.process(checksum, i)
+            if revert is not None:
+                reverts.append(tuple(revert))
+
+        eq_(reverts, list(reference_detect(checksums, radius)))
+
+
+def test_interned_detector():
+    random = Random(0)
+    checksums = [str(random.randint(0, 6)) for _ in range(500)]
+    checksums = [c if c != "6" else None for c in checksums]
+
+    detector = Detector(5)
+    interned_detector = Detector(5, intern=True)
+    for i, checksum in enumerate(checksums):
+        # Unknown checksums are represented by unique values
+        eq_(tuple(interned_detector.process(checksum, i) or ()),
+            tuple(detector.process(checksum or object(), i) or ()))
+
+    # Only checksums in the window hold ids
+    assert len(interned_detector.interner) <= 6
+
+
+def test_lazy_detector():
+    detector = Detector(2, lazy=True)
+
+    detector.process("a", {'id': 1})
+    detector.process("b", {'id': 2})
+    detector.process("c", {'id': 3})
+    revert = detector.process("a", {'id': 4})
+    eq_(len(revert.reverteds), 2)
+    for i in range(5, 10):
+        detector.process("d", {'id': i})
+
+    eq_(revert, ({'id': 4}, [{'id': 3}, {'id': 2}], {'id': 1}))
+    eq_(revert.to_json()['reverteds'], [{'id': 3}, {'id': 2}])
+
+
+def test_multi_radius_detector():
+    random = Random(0)
+    checksums = [random.randint(0, 20) for _ in range(1000)]
+
+    radii = [2, 5, 15]
+    detectors = {radius: Detector(radius) for radius in radii}
+    multi_detector = Detector(radii)
+    for i, checksum in enumerate(checksums):
+        revert = multi_detector.process(checksum, i)
+        for radius, detector in detectors.items():
+            expected = detector.process(checksum, i)
+            if revert is not None and revert.radius <= radius:
+                eq_(tuple(revert), tuple(expected))
+            else:
+                eq_(expected, None)
+
+    eq_(Detector(5).process(1, 1), None)
+    eq_(Detector([2, 5]).maxsize, 6)
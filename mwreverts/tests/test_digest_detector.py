@@ -0,0 +1,67 @@
+import hashlib
+from random import Random
+
+from nose.tools import eq_, raises
+
+from ..detector import Detector
+from ..digest_detector import DigestDetector
+
+
+def sha1(value):
+    return hashlib.sha1(bytes(str(value), 'utf8')).digest()
+
+
+def test_digest_detector():
+    detector = DigestDetector(2)
+
+    eq_(detector.process(sha1("a"), {'id': 1}), None)
+
+    # Check noop
+    eq_(detector.process(sha1("a"), {'id': 2}), None)
+
+    # Short revert
+    eq_(detector.process(sha1("b"), {'id': 3}), None)
+    eq_(
+        detector.process(sha1("a"), {'id': 4}),
+        ({'id': 4}, [{'id': 3}], {'id': 2})
+    )
+
+    # Medium revert
+    eq_(detector.process(sha1("c"), {'id': 5}), None)
+    eq_(detector.process(None, {'id': 6}), None)
+    eq_(
+        detector.process(sha1("a"), {'id': 7}),
+        ({'id': 7}, [{'id': 6}, {'id': 5}], {'id': 4})
+    )
+
+    # Long (undetected) revert
+    eq_(detector.process(sha1("e"), {'id': 8}), None)
+    eq_(detector.process(sha1("f"), {'id': 9}), None)
+    eq_(detector.process(sha1("g"), {'id': 10}), None)
+    eq_(detector.process(sha1("a"), {'id': 11}), None)
+
+    # Reset
+    detector.reset()
+    eq_(detector.process(sha1("e"), {'id': 12}), None)
+    eq_(detector.process(sha1("f"), {'id': 13}), None)
+    eq_(
+        detector.process(sha1("e"), {'id': 14}),
+        ({'id': 14}, [{'id': 13}], {'id': 12})
+    )
+
+
+def test_matches_detector():
+    random = Random(0)
+    for radius in (1, 2, 7, 15, 100):
+        values = [random.randint(0, 10) for _ in range(2000)]
+
+        detector = Detector(radius)
+        digest_detector = DigestDetector(radius)
+        for i, value in enumerate(values):
+            eq_(tuple(digest_detector.process(sha1(value), i) or ()),
+                tuple(detector.process(value, i) or ()))
+
+
+@raises(ValueError)
+def test_wrong_width():
+    DigestDetector(2).process(b"abc")
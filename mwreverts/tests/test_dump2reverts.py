@@ -0,0 +1,73 @@
+import io
+import re
+
+import mwxml
+from nose.tools import eq_
+
+from ..utilities.dump2reverts import dump2reverts
+from ..utilities.revdocs2reverts import revdocs2reverts
+from .test_revdocs2reverts import REV_DOCS
+
+REVISION_XML = """
+    <revision>
+      <id>{id}</id>
+      <timestamp>{timestamp}</timestamp>
+      <contributor><username>Foo</username><id>10</id></contributor>
+      <comment>{comment}</comment>
+      <model>wikitext</model>
+      <format>text/x-wiki</format>
+      <text xml:space="preserve" bytes="1">{text}</text>
+      <sha1>sha1-{text}</sha1>
+    </revision>"""
+
+DUMP_XML = """<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/"
+           version="0.10" xml:lang="en">
+  <siteinfo>
+    <sitename>Wikipedia</sitename>
+    <namespaces><namespace key="0" case="first-letter" /></namespaces>
+  </siteinfo>
+  <page>
+    <title>Foo</title>
+    <ns>0</ns>
+    <id>1</id>{revisions}
+  </page>
+</mediawiki>""".format(revisions="".join(REVISION_XML.format(**rev_doc)
+                                         for rev_doc in REV_DOCS))
+
+
+STUB_XML = re.sub(r"<text[^>]*>[^<]*</text>", '<text bytes="1" />', DUMP_XML)
+
+
+def read_dump():
+    return mwxml.Dump.from_file(io.StringIO(DUMP_XML))
+
+
+def test_fields():
+    fields = ['id', 'timestamp', 'comment']
+    expected = list(revdocs2reverts(REV_DOCS, radius=2, fields=fields))
+    eq_(list(dump2reverts(read_dump(), radius=2, fields=fields)), expected)
+    eq_(list(dump2reverts(read_dump(), radius=2, fields=fields,
+                          use_sha1=True)),
+        expected)
+
+
+def test_complete_documents():
+    reverts = list(dump2reverts(read_dump(), radius=2))
+    eq_(len(reverts), 2)
+    reverting = reverts[0]['reverting']
+    eq_(reverting['id'], 3)
+    eq_(reverting['page']['title'], "Foo")
+    eq_(reverting['user'], {'id': 10, 'text': "Foo"})
+    eq_(reverting['text'], "a")
+    main = reverting.get('slots', {}).get('contents', {}).get('main', {})
+    assert 'text' not in main
+
+
+def test_stub():
+    fields = ['id', 'timestamp', 'user', 'comment', 'minor', 'sha1']
+    expected = list(dump2reverts(read_dump(), radius=2, fields=fields,
+                                 use_sha1=True))
+    eq_(len(expected), 2)
+    eq_(list(dump2reverts(io.StringIO(STUB_XML), radius=2, fields=fields,
+                          stub=True)),
+        expected)
@@ -0,0 +1,26 @@
+from random import Random
+
+from nose.tools import eq_
+
+from ..utilities.external_sort import sort_rev_docs
+
+
+def key(rev_doc):
+    return rev_doc['timestamp']
+
+
+def test_sort_rev_docs():
+    random = Random(0)
+    rev_docs = [{'id': i, 'timestamp': random.randint(0, 100),
+                 'text': "x" * random.randint(0, 1000)}
+                for i in range(500)]
+    expected = sorted(rev_docs, key=key)
+
+    # In memory
+    eq_(list(sort_rev_docs(rev_docs, key)), expected)
+
+    # Spilled in runs of a few documents.  Ties keep their input order.
+    eq_(list(sort_rev_docs(rev_docs, key, sort_buffer=2000)), expected)
+    eq_(list(sort_rev_docs(rev_docs, key, sort_buffer=0)), expected)
+
+    eq_(list(sort_rev_docs([], key, sort_buffer=0)), [])
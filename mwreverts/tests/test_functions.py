@@ -1,4 +1,4 @@
-from nose.tools import eq_
+from nose.tools import eq_, raises
 
 from ..functions import detect
 
@@ -21,3 +21,8 @@ def test_detect():
 
     for revert in detect(checksum_revisions, radius=2):
         eq_(revert, expected.pop(0))
+
+
+@raises(TypeError)
+def test_revisions_without_array():
+    list(detect([("a", 1), ("b", 2), ("a", 3)], revisions=[1, 2, 3]))
@@ -31,3 +31,24 @@ def test_historical_dict():
 
     print(d.to_json())
     eq_(d, HistoricalDict(d.to_json()))
+
+
+def test_since():
+    d = HistoricalDict(3)
+    d.insert("a", 1)
+    d.insert("b", 2)
+    d.insert("c", 3)
+    eq_(d.since("a"), [3, 2])
+    eq_(list(d.up_to("a")), [3, 2])
+
+    d.insert("d", 4)  # Expectorates "a"
+    assert "a" not in d
+    eq_(d.since("a"), [4, 3, 2])
+    eq_(list(d.up_to("a")), [4, 3, 2])
+    eq_(d.since("d"), [])
+
+    for i in range(5, 20):
+        d.insert("b", i)
+    eq_(d.history, [("b", 17), ("b", 18), ("b", 19)])
+    eq_(d['b'], 19)
+    eq_(d.last(), ("b", 19))
@@ -0,0 +1,26 @@
+from nose.tools import eq_
+
+from ..interner import Interner
+
+
+def test_interner():
+    interner = Interner()
+
+    eq_(interner.intern("aaa"), 0)
+    eq_(interner.intern(b"bbb"), 1)
+    eq_(interner.intern("aaa"), 0)
+    eq_(len(interner), 2)
+
+    # Unknowns never match
+    eq_(interner.intern(None), -1)
+    eq_(interner.intern(None), -2)
+    eq_(interner.checksum(-1), None)
+    eq_(len(interner), 2)
+
+    # Released ids are re-used
+    interner.release(0)
+    eq_(len(interner), 1)
+    eq_(interner.intern("ccc"), 0)
+    eq_(interner.checksum(0), "ccc")
+    eq_(interner.intern("aaa"), 2)
+    eq_(interner.checksum(1), b"bbb")
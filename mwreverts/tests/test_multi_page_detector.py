@@ -0,0 +1,55 @@
+from random import Random
+
+from nose.tools import eq_
+
+from ..detector import Detector
+from ..multi_page_detector import MultiPageDetector
+
+
+def test_multi_page_detector():
+    detector = MultiPageDetector(radius=2)
+
+    eq_(detector.process(1, "a", {'id': 1}), None)
+    eq_(detector.process(2, "a", {'id': 2}), None)
+    eq_(detector.process(1, "b", {'id': 3}), None)
+    eq_(detector.process(2, "b", {'id': 4}), None)
+    eq_(detector.process(2, "a", {'id': 5}),
+        ({'id': 5}, [{'id': 4}], {'id': 2}))
+    eq_(detector.process(1, "a", {'id': 6}),
+        ({'id': 6}, [{'id': 3}], {'id': 1}))
+    eq_(len(detector), 2)
+    eq_(detector.revisions, 6)
+
+
+def test_matches_detector():
+    random = Random(0)
+    stream = [(random.randint(0, 9), random.randint(0, 5), i)
+              for i in range(2000)]
+
+    detectors = {page_id: Detector(5) for page_id in range(10)}
+    multi_page_detector = MultiPageDetector(radius=5)
+    for page_id, checksum, rev_id in stream:
+        revert = multi_page_detector.process(page_id, checksum, rev_id)
+        eq_(tuple(revert or ()),
+            tuple(detectors[page_id].process(checksum, rev_id) or ()))
+
+
+def test_eviction():
+    evicted = []
+    detector = MultiPageDetector(
+        radius=2, max_pages=2, max_revisions=3,
+        on_evict=lambda page_id, d: evicted.append(page_id))
+
+    detector.process(1, "a", {'id': 1})
+    detector.process(2, "a", {'id': 2})
+    detector.process(1, "b", {'id': 3})
+    detector.process(3, "a", {'id': 4})  # Evicts 2 (LRU)
+    eq_(evicted, [2])
+    assert 2 not in detector
+    detector.process(1, "c", {'id': 5})  # Exceeds the revision budget
+    eq_(evicted, [2, 3])
+    eq_(detector.revisions, 3)
+
+    # Page 2 starts fresh
+    detector.process(2, "b", {'id': 6})
+    eq_(detector.process(2, "a", {'id': 7}), None)
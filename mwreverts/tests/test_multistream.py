@@ -0,0 +1,74 @@
+import bz2
+import io
+import os
+import tempfile
+
+from mwcli import files
+from nose.tools import eq_
+
+from ..utilities import multistream
+from ..utilities.dump2reverts import (dump2reverts, multistream2reverts,
+                                      streamer)
+from .test_dump2reverts import DUMP_XML
+
+HEADER, PAGE_XML = DUMP_XML[:DUMP_XML.index("  <page>")], \
+    DUMP_XML[DUMP_XML.index("  <page>"):DUMP_XML.index("</mediawiki>")]
+
+
+def write_multistream(directory, n_pages, pages_per_stream, name="test"):
+    pages = [PAGE_XML.replace("<id>1</id>", "<id>{0}</id>".format(page_id), 1)
+             for page_id in range(1, n_pages + 1)]
+    path = os.path.join(directory, name + "-multistream.xml.bz2")
+    index = []
+    with open(path, "wb") as f:
+        f.write(bz2.compress(HEADER.encode("utf-8")))
+        for i in range(0, n_pages, pages_per_stream):
+            index.extend("{0}:{1}:Foo\n".format(f.tell(), page_id + 1)
+                         for page_id in range(i, i + pages_per_stream))
+            f.write(bz2.compress(
+                "".join(pages[i:i + pages_per_stream]).encode("utf-8")))
+        f.write(bz2.compress(b"</mediawiki>\n"))
+
+    with bz2.open(multistream.index_path(path), "wt") as f:
+        f.write("".join(index))
+
+    return path, "".join([HEADER] + pages + ["</mediawiki>\n"])
+
+
+def test_chunk_streams():
+    eq_(multistream.chunk_streams([10, 20, 30], 50, streams_per_chunk=2),
+        [(10, 30), (30, 50)])
+
+
+def test_multistream2reverts():
+    with tempfile.TemporaryDirectory() as directory:
+        path, xml = write_multistream(directory, n_pages=5,
+                                      pages_per_stream=2)
+        eq_(multistream.read_offsets(multistream.index_path(path))[0],
+            len(bz2.compress(HEADER.encode("utf-8"))))
+
+        expected = list(dump2reverts(io.StringIO(xml), radius=2,
+                                     fields=['id']))
+        eq_(len(expected), 10)
+        eq_(list(multistream2reverts(path, workers=2, streams_per_chunk=1,
+                                     radius=2, fields=['id'])),
+            expected)
+
+
+def test_multistream_files():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [write_multistream(directory, n_pages=5, pages_per_stream=2,
+                                   name=name)[0]
+                 for name in ["foo", "bar"]]
+
+        output_dir = os.path.join(directory, "output")
+        os.mkdir(output_dir)
+        streamer.main(paths + ["--radius=2", "--fields=id",
+                               "--multistream-workers=2", "--threads=2",
+                               "--output=" + output_dir])
+
+        output_paths = sorted(os.listdir(output_dir))
+        eq_(len(output_paths), 2)
+        for output_path in output_paths:
+            with files.reader(os.path.join(output_dir, output_path)) as f:
+                eq_(len(f.readlines()), 10)
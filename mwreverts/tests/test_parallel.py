@@ -0,0 +1,62 @@
+from random import Random
+
+from nose.tools import eq_, raises
+
+from ..functions import detect
+from ..parallel import chunk_history, detect_pages
+
+
+def test_detect_pages():
+    random = Random(0)
+    pages = [[(random.randint(0, 5), {'page': page_id, 'id': i})
+              for i in range(200)]
+             for page_id in range(10)]
+
+    expected = [tuple(revert) for page in pages
+                for revert in detect(page, radius=5)]
+
+    reverts = [tuple(revert)
+               for revert in detect_pages(pages, radius=5, workers=2)]
+    eq_(reverts, expected)
+
+    reverts = detect_pages(pages, radius=5, workers=2, ordered=False,
+                           max_in_flight=3)
+    eq_(sorted((tuple(revert) for revert in reverts), key=reverting_key),
+        sorted(expected, key=reverting_key))
+
+
+def reverting_key(revert):
+    return revert[0]['page'], revert[0]['id']
+
+
+def test_chunked_pages():
+    random = Random(1)
+    pages = [[(random.randint(0, 5), {'page': page_id, 'id': i})
+              for i in range(length)]
+             for page_id, length in enumerate([1, 7, 8, 300])]
+
+    expected = [tuple(revert) for page in pages
+                for revert in detect(page, radius=5)]
+
+    for chunk_size in [1, 7, 50]:
+        reverts = [tuple(revert)
+                   for revert in detect_pages(pages, radius=5, workers=2,
+                                              chunk_size=chunk_size)]
+        eq_(reverts, expected)
+
+
+def test_chunk_history():
+    eq_(list(chunk_history(range(7), radius=1, chunk_size=3)),
+        [(0, [0, 1, 2]), (2, [1, 2, 3, 4, 5]), (2, [4, 5, 6])])
+
+
+def test_radii():
+    pages = [[("aaa", {'rev_id': 1}), ("bbb", {'rev_id': 2}),
+              ("ccc", {'rev_id': 3}), ("aaa", {'rev_id': 4})]]
+    reverts = list(detect_pages(pages, radius=[1, 2], workers=2))
+    eq_([revert.radius for revert in reverts], [2])
+
+
+@raises(TypeError)
+def test_invalid_radius():
+    list(detect_pages([], radius=[0, 2], workers=2))
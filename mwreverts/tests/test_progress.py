@@ -0,0 +1,39 @@
+import io
+
+from nose.tools import eq_
+
+from ..utilities.progress import CountingReader, Progress
+from ..utilities.stats import Stats
+
+
+def test_progress():
+    f = io.StringIO()
+    progress = Progress(f, interval=60)
+    stats = Stats()
+
+    stats.count('pages')
+    stats.count('revisions', 10)
+    progress.tick(stats)
+    stats.count('revisions', 5)
+    progress.tick(stats)  # Throttled
+    eq_(f.getvalue().count("\r"), 1)
+    assert "10 revisions" in f.getvalue()
+
+    # Counts from a second source are aggregated
+    other_stats = Stats()
+    other_stats.count('reverts', 2)
+    progress.tick(stats, force=True)
+    progress.tick(other_stats, force=True)
+    progress.close()
+    last_line = f.getvalue().split("\r")[-1]
+    assert last_line.startswith("1 pages")
+    assert "15 revisions" in last_line
+    assert "2 reverts" in last_line
+    assert last_line.endswith("\n")
+
+
+def test_counting_reader():
+    stats = Stats()
+    f = CountingReader(io.StringIO("foo\nbar\n"), stats)
+    eq_(list(f), ["foo\n", "bar\n"])
+    eq_(stats.counts['bytes_read'], 8)
@@ -0,0 +1,207 @@
+import io
+import json
+import os
+import tempfile
+
+from mwcli import files
+from nose.tools import eq_, raises
+
+from .. import sidecar
+from ..utilities.revdocs2reverts import revdocs2reverts, streamer
+from ..utilities.stats import Stats
+
+PAGE = {'id': 1, 'title': "Foo"}
+
+REV_DOCS = [
+    {'id': 1, 'timestamp': "2020-01-01T00:00:01Z", 'page': PAGE,
+     'text': "a", 'comment': "first"},
+    {'id': 2, 'timestamp': "2020-01-01T00:00:02Z", 'page': PAGE,
+     'text': "b", 'comment': "vandalism"},
+    {'id': 3, 'timestamp': "2020-01-01T00:00:03Z", 'page': PAGE,
+     'text': "a", 'comment': "revert"},
+    {'id': 4, 'timestamp': "2020-01-01T00:00:04Z", 'page': PAGE,
+     'text': "c", 'comment': "more vandalism"},
+    {'id': 5, 'timestamp': "2020-01-01T00:00:05Z", 'page': PAGE,
+     'text': "a", 'comment': "revert"}
+]
+
+
+def test_revdocs2reverts():
+    reverts = list(revdocs2reverts(REV_DOCS, radius=2))
+    eq_(len(reverts), 2)
+    eq_(reverts[0]['reverting'], REV_DOCS[2])
+    eq_(reverts[0]['reverteds'], [REV_DOCS[1]])
+    eq_(reverts[0]['reverted_to'], REV_DOCS[0])
+
+
+def test_fields():
+    reverts = list(revdocs2reverts(REV_DOCS, radius=2, fields=['id']))
+    eq_(reverts[1],
+        {'reverting': {'id': 5}, 'reverteds': [{'id': 4}],
+         'reverted_to': {'id': 3}})
+
+
+def test_state():
+    path = os.path.join(tempfile.mkdtemp(), "state.db")
+
+    first_run = list(revdocs2reverts(REV_DOCS[:4], radius=2, state=path))
+    second_run = list(revdocs2reverts(REV_DOCS, radius=2, state=path))
+    expected = list(revdocs2reverts(REV_DOCS, radius=2))
+    eq_(first_run, expected[:1])
+    eq_(list(revdocs2reverts(REV_DOCS, radius=2, state=path)), [])
+
+    # Stored revisions are restored without their text, so a resumed run
+    # differs from a single pass only in the text of those revisions.
+    eq_(expected[1]['reverteds'], [REV_DOCS[3]])
+    eq_(second_run[0]['reverting'], expected[1]['reverting'])
+    eq_(second_run[0]['reverted_to'], without_text(expected[1]['reverted_to']))
+    eq_(second_run[0]['reverteds'],
+        [without_text(rev_doc) for rev_doc in expected[1]['reverteds']])
+
+
+def test_state_fields():
+    # Without text in the output, a resumed run matches a single pass
+    path = os.path.join(tempfile.mkdtemp(), "state.db")
+    fields = ['id', 'timestamp', 'comment']
+
+    first_run = list(revdocs2reverts(REV_DOCS[:4], radius=2, state=path,
+                                     fields=fields))
+    second_run = list(revdocs2reverts(REV_DOCS, radius=2, state=path,
+                                      fields=fields))
+    eq_(first_run + second_run,
+        list(revdocs2reverts(REV_DOCS, radius=2, fields=fields)))
+
+
+def test_state_hashers():
+    path = os.path.join(tempfile.mkdtemp(), "state.db")
+
+    list(revdocs2reverts(REV_DOCS[:4], radius=2, state=path))
+    # The stored sha1 digests can't seed a blake2b run, so the page is
+    # reprocessed and only the revert of the new revision is emitted.
+    eq_(list(revdocs2reverts(REV_DOCS, radius=2, state=path,
+                             hasher='blake2b')),
+        list(revdocs2reverts(REV_DOCS, radius=2))[1:])
+    eq_(list(revdocs2reverts(REV_DOCS, radius=2, state=path,
+                             hasher='blake2b')), [])
+
+
+def without_text(rev_doc):
+    return {field: value for field, value in rev_doc.items()
+            if field != 'text'}
+
+
+def test_stats():
+    stats = Stats()
+    list(revdocs2reverts(REV_DOCS, radius=2, stats=stats))
+    eq_(stats.counts['pages'], 1)
+    eq_(stats.counts['revisions'], 5)
+    eq_(stats.counts['bytes_hashed'], 5)
+    eq_(stats.counts['reverts'], 2)
+    assert stats.timers['detect'] > 0
+
+    merged = Stats(stats.to_json()).merge(stats)
+    eq_(merged.counts['revisions'], 10)
+
+
+def test_hash_threads():
+    eq_(list(revdocs2reverts(REV_DOCS, radius=2, hash_threads=2)),
+        list(revdocs2reverts(REV_DOCS, radius=2)))
+
+
+def test_page_workers():
+    other_page = {'id': 2, 'title': "Bar"}
+    rev_docs = REV_DOCS + [dict(rev_doc, page=other_page, id=rev_doc['id'] + 5)
+                           for rev_doc in REV_DOCS]
+    stats = Stats()
+    eq_(list(revdocs2reverts(rev_docs, radius=2, page_workers=2,
+                             stats=stats)),
+        list(revdocs2reverts(rev_docs, radius=2)))
+    eq_(stats.counts['pages'], 2)
+    eq_(stats.counts['revisions'], 10)
+
+
+def test_chunk_size():
+    other_page = {'id': 2, 'title': "Bar"}
+    rev_docs = REV_DOCS + [dict(rev_doc, page=other_page, id=rev_doc['id'] + 5)
+                           for rev_doc in REV_DOCS]
+    for chunk_size in [1, 2, 4]:
+        stats = Stats()
+        eq_(list(revdocs2reverts(rev_docs, radius=2, page_workers=2,
+                                 chunk_size=chunk_size, stats=stats)),
+            list(revdocs2reverts(rev_docs, radius=2)))
+        eq_(stats.counts['pages'], 2)
+        eq_(stats.counts['revisions'], 10)
+
+
+def test_chunk_size_without_text():
+    other_page = {'id': 2, 'title': "Bar"}
+    rev_docs = REV_DOCS + [{'id': 6, 'page': other_page}]
+    f = io.BytesIO()
+    stats = Stats()
+    eq_(list(revdocs2reverts(rev_docs, radius=2, page_workers=2,
+                             chunk_size=2, sidecar=sidecar.Writer(f),
+                             stats=stats)),
+        list(revdocs2reverts(REV_DOCS, radius=2)))
+    eq_(stats.counts['pages'], 2)
+
+    f.seek(0)
+    eq_([(page_id, len(records)) for page_id, records in sidecar.read(f)],
+        [(1, 5), (2, 0)])
+
+
+def test_json_lines():
+    lines = [json.dumps(rev_doc) for rev_doc in REV_DOCS]
+    eq_(list(revdocs2reverts(lines, radius=2)),
+        list(revdocs2reverts(REV_DOCS, radius=2)))
+    eq_(list(revdocs2reverts(lines, radius=2, fields=['id', 'comment'])),
+        list(revdocs2reverts(REV_DOCS, radius=2, fields=['id', 'comment'])))
+    eq_(list(revdocs2reverts(lines, radius=2, fields=['id', 'comment'],
+                             selective_decode=True)),
+        list(revdocs2reverts(REV_DOCS, radius=2, fields=['id', 'comment'])))
+
+
+@raises(ValueError)
+def test_selective_decode_without_fields():
+    list(revdocs2reverts([json.dumps(REV_DOCS[0])], selective_decode=True))
+
+
+def test_resort():
+    eq_(list(revdocs2reverts(reversed(REV_DOCS), radius=2, resort=True,
+                             sort_buffer=0)),
+        list(revdocs2reverts(REV_DOCS, radius=2)))
+
+
+def test_radii():
+    reverts = list(revdocs2reverts(REV_DOCS, radius=[1, 2]))
+    eq_([revert.pop('radius') for revert in reverts], [1, 1])
+    eq_(reverts, list(revdocs2reverts(REV_DOCS, radius=2)))
+
+
+def test_hashers():
+    expected = list(revdocs2reverts(REV_DOCS, radius=2))
+    for hasher in ['blake2b', 'crc32']:
+        eq_(list(revdocs2reverts(REV_DOCS, radius=2, hasher=hasher)),
+            expected)
+
+
+def test_page_workers_files():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for page_id in [1, 2]:
+            path = os.path.join(directory, "page{0}.json".format(page_id))
+            with open(path, "w") as f:
+                for rev_doc in REV_DOCS:
+                    page = {'id': page_id, 'title': "Foo"}
+                    f.write(json.dumps(dict(rev_doc, page=page)) + "\n")
+            paths.append(path)
+
+        output_dir = os.path.join(directory, "output")
+        os.mkdir(output_dir)
+        streamer.main(paths + ["--radius=2", "--page-workers=2",
+                               "--threads=2", "--output=" + output_dir])
+
+        output_paths = sorted(os.listdir(output_dir))
+        eq_(len(output_paths), 2)
+        for output_path in output_paths:
+            with files.reader(os.path.join(output_dir, output_path)) as f:
+                eq_(len(f.readlines()), 2)
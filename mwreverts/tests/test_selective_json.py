@@ -0,0 +1,30 @@
+import json
+
+from nose.tools import eq_, raises
+
+from ..utilities import selective_json
+
+DOC = {'id': 1, 'page': {'id': 2, 'title': "Foo"}, 'minor': False,
+       'comment': "Quotes \" and \\ backslashes \\\"", 'text': "\"" * 20,
+       'user': None, 'sha1': "aaa", 'tags': ["a", "b"]}
+
+
+def test_loads():
+    line = json.dumps(DOC)
+    eq_(selective_json.loads(line, {'id', 'sha1'}), {'id': 1, 'sha1': "aaa"})
+    eq_(selective_json.loads(line, {'page', 'tags', 'missing'}),
+        {'page': DOC['page'], 'tags': DOC['tags']})
+    eq_(selective_json.loads(line, set(DOC)), DOC)
+    eq_(selective_json.loads(json.dumps(DOC, indent=2), {'sha1'}),
+        {'sha1': "aaa"})
+    eq_(selective_json.loads(" {} \n", {'id'}), {})
+
+
+@raises(ValueError)
+def test_unterminated():
+    selective_json.loads('{"text": "foo, "id": 1', {'id'})
+
+
+@raises(ValueError)
+def test_not_an_object():
+    selective_json.loads('[1, 2]', {'id'})
@@ -0,0 +1,80 @@
+import gzip
+import io
+import os
+import tempfile
+
+from mwcli import files
+from nose.tools import eq_
+
+from .. import sidecar
+from ..utilities.revdocs2reverts import revdocs2reverts
+from ..utilities.sidecar2reverts import sidecar2reverts, streamer
+from .test_revdocs2reverts import REV_DOCS
+
+
+def test_round_trip():
+    f = io.BytesIO()
+    writer = sidecar.Writer(f)
+    writer.write_page(1, [(10, "2020-01-01T00:00:05Z", b"a" * 20),
+                          (11, None, "aaa"),
+                          (None, 1577836805, None)])
+    writer.write_page(2, [])
+
+    f.seek(0)
+    eq_(list(sidecar.read(f)),
+        [(1, [(10, 1577836805, b"a" * 20),
+              (11, None, sidecar.digest("aaa")),
+              (None, 1577836805, None)]),
+         (2, [])])
+
+
+def test_compressed():
+    f = io.BytesIO()
+    writer = sidecar.Writer(f, compress="gz")
+    writer.write_page(1, [(10, None, "aaa")])
+    writer.write_page(2, [(11, None, "bbb")])
+
+    pages = list(sidecar.read(gzip.GzipFile(fileobj=io.BytesIO(f.getvalue()))))
+    eq_([page_id for page_id, _ in pages], [1, 2])
+
+
+def test_sidecar2reverts():
+    f = io.BytesIO()
+    reverts = list(revdocs2reverts(REV_DOCS, radius=2,
+                                   sidecar=sidecar.Writer(f),
+                                   fields=['id', 'timestamp']))
+
+    f.seek(0)
+    sidecar_reverts = list(sidecar2reverts(sidecar.read(f), radius=2))
+    eq_(sidecar_reverts[0]['reverting']['page'], {'id': 1})
+    for revert in sidecar_reverts:
+        for revision in [revert['reverting'], revert['reverted_to']] + \
+                revert['reverteds']:
+            del revision['page']
+    eq_(sidecar_reverts, reverts)
+
+
+def test_int_digests():
+    f = io.BytesIO()
+    writer = sidecar.Writer(f, width=8)
+    writer.write_page(1, [(10, None, -5), (11, None, None)])
+
+    f.seek(0)
+    eq_(list(sidecar.read(f)),
+        [(1, [(10, None, (-5).to_bytes(8, 'little', signed=True)),
+              (11, None, None)])])
+
+
+def test_plain_path():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "sidecar.bin")
+        reverts = list(revdocs2reverts(REV_DOCS, radius=2, sidecar=path))
+        eq_(len(reverts), 2)
+
+        output_dir = os.path.join(directory, "output")
+        os.mkdir(output_dir)
+        streamer.main([path, "--radius=2", "--output=" + output_dir])
+
+        output_path, = os.listdir(output_dir)
+        with files.reader(os.path.join(output_dir, output_path)) as f:
+            eq_(len(f.readlines()), 2)
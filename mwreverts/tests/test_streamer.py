@@ -0,0 +1,23 @@
+import io
+import os
+import tempfile
+
+from nose.tools import eq_
+
+from ..utilities.streamer import schedule
+
+
+def test_schedule():
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for name, size in [("small", 10), ("large", 1000), ("medium", 100)]:
+            path = os.path.join(directory, name + ".json")
+            with open(path, "w") as f:
+                f.write("x" * size)
+            paths.append(path)
+
+        eq_([os.path.basename(path) for path in schedule(paths)],
+            ["large.json", "medium.json", "small.json"])
+
+        stdin = io.StringIO()
+        eq_(schedule([paths[0], stdin])[1], stdin)
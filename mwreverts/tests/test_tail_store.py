@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+from nose.tools import eq_
+
+from ..detector import Detector
+from ..tail_store import TailStore
+
+
+def test_tail_store():
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "state.db")
+
+    detector = Detector(2, intern=True)
+    for rev_id, checksum in enumerate(["a", "b", "c", "b"]):
+        detector.process(checksum, {'id': rev_id})
+
+    store = TailStore(path)
+    eq_(store.load(10), None)
+    store.save(10, 2, detector, ("2020-01-01T00:00:00Z", 3), "sha1")
+    store.close()
+
+    store = TailStore(path)
+    radius, restored, last, checksum_kind = store.load(10)
+    eq_(radius, 2)
+    eq_(last, ("2020-01-01T00:00:00Z", 3))
+    eq_(checksum_kind, "sha1")
+    eq_(tuple(restored.process("c", {'id': 4})),
+        ({'id': 4}, [{'id': 3}], {'id': 2}))
+    store.close()
+
+
+def test_drop_fields():
+    path = os.path.join(tempfile.mkdtemp(), "state.db")
+
+    detector = Detector(2)
+    detector.process("a", {'id': 1, 'text': "a"})
+    detector.process("b", {'id': 2, 'text': "b"})
+
+    store = TailStore(path)
+    store.save(10, 2, detector, ("2020-01-01T00:00:00Z", 2))
+    _, restored, _, _ = store.load(10)
+    eq_(tuple(restored.process("a", {'id': 3, 'text': "a"})),
+        ({'id': 3, 'text': "a"}, [{'id': 2}], {'id': 1}))
+
+    # Other connections can read and write while the store is open
+    other = TailStore(path)
+    eq_(other.load(10)[0], 2)
+    other.save(11, 2, detector, ("2020-01-01T00:00:00Z", 1))
+    other.close()
+    store.close()
@@ -15,8 +15,14 @@ mwreverts revdocs2reverts
 .. automodule:: mwreverts.utilities.revdocs2reverts
     :noindex:
 
+mwreverts sidecar2reverts
++++++++++++++++++++++++++
+.. automodule:: mwreverts.utilities.sidecar2reverts
+    :noindex:
+
 """
 from .dump2reverts import dump2reverts
 from .revdocs2reverts import revdocs2reverts
+from .sidecar2reverts import sidecar2reverts
 
-__all__ = [dump2reverts, revdocs2reverts]
+__all__ = [dump2reverts, revdocs2reverts, sidecar2reverts]
@@ -0,0 +1,113 @@
+"""
+Writes reverts as columns of integers rather than JSON lines.  Using the
+``npz`` format, the output is a :func:`numpy.savez` archive with the
+following arrays (one entry per revert unless otherwise noted):
+
+* ``page_id`` -- the page of the reverting revision
+* ``reverting_id`` -- the rev_id of the reverting revision
+* ``reverting_timestamp`` -- Unix time of the reverting revision
+* ``reverted_to_id`` -- the rev_id of the reverted-to revision
+* ``reverted_to_timestamp`` -- Unix time of the reverted-to revision
+* ``reverted_count`` -- the number of reverted revisions
+* ``radius`` -- the smallest radius that detects the revert when several
+  radii are given (e.g. ``--radius=5,15,50``)
+* ``reverted_offsets`` -- `n + 1` offsets into ``reverted_ids``.  The reverted
+  revisions of revert `i` are
+  ``reverted_ids[reverted_offsets[i]:reverted_offsets[i + 1]]``
+* ``reverted_ids`` -- the rev_ids of all reverted revisions (most recent
+  first within each revert)
+
+Missing values (e.g. when ``--fields`` excludes `timestamp`) are written as
+-1.  All arrays are `int64`.  The `page` and `id` fields are always kept
+when ``--fields`` is set (see :attr:`NPZWriter.FIELDS`).
+
+>>> import numpy
+>>> reverts = numpy.load("enwiki-20170101-pages-meta-history1.npz")
+>>> reverts['reverting_id'][:3]
+array([233192, 233193, 233195])
+"""
+from array import array
+
+from mwtypes import Timestamp
+
+COLUMNS = ('page_id', 'reverting_id', 'reverting_timestamp',
+           'reverted_to_id', 'reverted_to_timestamp', 'reverted_count',
+           'radius')
+
+MISSING = -1
+
+
+class NPZWriter:
+    """
+    Collects revert documents into integer columns and writes them to a file
+    as an ``.npz`` archive when closed.
+
+    :Parameters:
+        f : `file`
+            a binary file to write to
+        compress : `bool`
+            compress the archive with zlib
+    """
+
+    FIELDS = ('page', 'id')
+    """
+    The revision document fields that must be kept in a projection
+    """
+
+    def __init__(self, f, compress=True):
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("The npz format requires numpy")
+
+        self.numpy = numpy
+        self.f = f
+        self.compress = bool(compress)
+        self.columns = {name: array('q') for name in COLUMNS}
+        self.reverted_offsets = array('q', [0])
+        self.reverted_ids = array('q')
+
+    def write(self, revert_doc):
+        reverting = revert_doc['reverting']
+        reverted_to = revert_doc['reverted_to']
+        reverteds = revert_doc['reverteds']
+
+        page = reverting.get('page') or {}
+        self.columns['page_id'].append(page.get('id', MISSING))
+        self.columns['reverting_id'].append(reverting.get('id', MISSING))
+        self.columns['reverting_timestamp'].append(unix(reverting))
+        self.columns['reverted_to_id'].append(reverted_to.get('id', MISSING))
+        self.columns['reverted_to_timestamp'].append(unix(reverted_to))
+        self.columns['reverted_count'].append(len(reverteds))
+        self.columns['radius'].append(revert_doc.get('radius', MISSING))
+
+        self.reverted_ids.extend(reverted.get('id', MISSING)
+                                 for reverted in reverteds)
+        self.reverted_offsets.append(len(self.reverted_ids))
+
+    def close(self):
+        arrays = {name: self.numpy.frombuffer(column, dtype='int64')
+                  for name, column in self.columns.items()}
+        arrays['reverted_offsets'] = \
+            self.numpy.frombuffer(self.reverted_offsets, dtype='int64')
+        arrays['reverted_ids'] = \
+            self.numpy.frombuffer(self.reverted_ids, dtype='int64')
+
+        if self.compress:
+            self.numpy.savez_compressed(self.f, **arrays)
+        else:
+            self.numpy.savez(self.f, **arrays)
+        self.f.flush()
+
+
+def unix(rev_doc):
+    if rev_doc.get('timestamp') is None:
+        return MISSING
+    else:
+        return Timestamp(rev_doc['timestamp']).unix()
+
+
+WRITERS = {'npz': NPZWriter}
+"""
+Maps output formats to the writer that produces them
+"""
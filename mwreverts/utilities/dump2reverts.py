@@ -6,46 +6,326 @@ r"""
 
     Usage:
         dump2reverts (-h|--help)
-        dump2reverts [<input-file>...] [--radius=<num>] [--use-sha1] [--resort]
-                     [--threads=<num>] [--output=<path>] [--compress=<type>]
-                     [--verbose] [--debug]
+        dump2reverts [<input-file>...] [--radius=<num>] [--use-sha1] [--stub]
+                     [--resort] [--sort-buffer=<MB>] [--fields=<names>]
+                     [--state=<path>] [--sidecar=<path>] [--hash=<name>]
+                     [--hash-threads=<num>] [--page-workers=<num>]
+                     [--chunk-size=<revs>] [--multistream-workers=<num>]
+                     [--threads=<num>] [--output=<path>] [--format=<type>]
+                     [--compress=<type>] [--stats=<path>] [--verbose]
+                     [--progress-interval=<ms>] [--debug]
 
     Options:
         -h|--help           Print this documentation
         <input-file>        The path to file containing MediaWiki XML
                             [default: <stdin>]
         --radius=<revs>     The maximum number of revisions that a revert can
-                            reference. [default: 15]
+                            reference.  If a comma-separated list of radii is
+                            provided (e.g. "5,15,50"), detection runs once
+                            with the largest and each revert is tagged with
+                            the smallest radius that detects it. [default: 15]
         --use-sha1          Use the sha1 field even if a text field is
                             available.
+        --stub              Read a stub dump (e.g. stub-meta-history) with a
+                            lightweight parser that only reads the page, id,
+                            timestamp, sha1 and --fields of each revision.
+                            The sha1 is used as the checksum.  Supported
+                            fields are user, comment, minor, parent_id, model
+                            and format.
         --resort            Re-sort the revisions within a page by timestamp
                             and rev_id.
+        --sort-buffer=<MB>  When re-sorting, the approximate amount of
+                            revision data to hold in memory.  Larger pages
+                            are sorted in runs that are spilled to temporary
+                            files and merged. [default: 256]
+        --fields=<names>    A comma-separated list of revision fields to
+                            include in the reverts (e.g.
+                            "id,timestamp,user,sha1").  Only these fields
+                            and those needed for detection are converted from
+                            the XML.  [default: <all>]
+        --state=<path>      The path to a SQLite file of per-page history
+                            tails.  Detection resumes from the stored tail of
+                            each page and only reverts involving new revisions
+                            are emitted.  The file is updated as pages are
+                            processed.  Revision text isn't stored, so
+                            stored revisions appear in reverts without it.
+        --sidecar=<path>    Append the page, rev_id, timestamp and checksum of
+                            every revision processed to a sidecar file that
+                            `mwreverts sidecar2reverts` can re-run detection
+                            from.  Use a ".gz" or ".bz2" extension to
+                            compress it.  [default: <none>]
+        --hash=<name>       The function that revision text is hashed with:
+                            "sha1", "blake2b" (64 bit) or "crc32" (32 bit).
+                            Shorter hashes are faster and use less memory,
+                            but risk false reverts when distinct texts
+                            collide (see mwreverts.hashers). [default: sha1]
+        --hash-threads=<num>
+                            Hash revision text ahead of detection in a pool of
+                            this many threads.  hashlib releases the GIL, so
+                            this helps with large texts. [default: 0]
+        --page-workers=<num>
+                            Detect reverts in a pool of this many processes,
+                            one page at a time.  This can't be combined
+                            with --state.  Input files are then processed
+                            one at a time rather than by --threads
+                            processes. [default: 0]
+        --multistream-workers=<num>
+                            Read each <input-file> as a multistream bz2 dump
+                            ("*-multistream.xml.bz2") and decompress, parse
+                            and detect its streams in a pool of this many
+                            processes.  The stream index
+                            ("*-multistream-index.txt.bz2") must be next to
+                            the dump.  Reverts are written in page order.
+                            This can't be combined with --state or
+                            page workers.  Input files are then processed
+                            one at a time rather than by --threads
+                            processes. [default: 0]
+        --chunk-size=<revs>
+                            When processing pages in a pool of processes,
+                            split pages into chunks of this many revisions
+                            so that long histories are processed in
+                            parallel.  Each chunk is preceded by the radius
+                            + 1 revisions before it, so the reverts are the
+                            same as without chunking.
+                            [default: <none>]
         --threads=<num>     If a collection of files are provided, how many
-                            processor threads? [default: <cpu_count>]
+                            processor threads?  Files are processed
+                            largest-first. [default: <cpu_count>]
         --output=<path>     Write output to a directory with one output file
                             per input path.  [default: <stdout>]
+        --format=<type>     The output format.  "json" writes a JSON line per
+                            revert.  "npz" writes integer columns to a NumPy
+                            archive (see mwreverts.utilities.columnar).
+                            [default: json]
         --compress=<type>   If set, output written to the output-dir will be
-                            compressed in this format. [default: bz2]
-        --verbose           Print dots and stuff to stderr
+                            compressed in this format.  The npz format is
+                            zlib-compressed unless this is "plaintext".
+                            [default: bz2]
+        --stats=<path>      Write counters and per-stage timings (reading,
+                            hashing, detection, serialization and output) to
+                            this path as JSON.  The statistics of all input
+                            files are merged.  [default: <none>]
+        --verbose           Print a status line of progress (pages, revisions
+                            and reverts processed, input consumed and rates)
+                            to stderr.
+        --progress-interval=<ms>
+                            How often the status line is updated in
+                            milliseconds. [default: 500]
         --debug             Print debug logs.
 """
-import mwcli
+import io
+import os
+import time
+from functools import partial
+
 import mwxml
-import mwxml.utilities
 
-from .revdocs2reverts import process_args, revdocs2reverts
+from ..parallel import map_pages
+from . import multistream, stub_reader
+from .progress import Progress
+from .revdocs2reverts import process_args as process_revdocs_args
+from .revdocs2reverts import read_lines, revdocs2reverts
+from .stats import Stats
+from .streamer import Streamer
+
+
+def process_args(args):
+    kwargs = process_revdocs_args(args)
+    kwargs['stub'] = bool(args['--stub'])
+    kwargs['multistream_workers'] = int(args['--multistream-workers'])
+    return kwargs
+
+
+def dump2reverts(dump, use_sha1=False, fields=None, stub=False, path=None,
+                 multistream_workers=0, **kwargs):
+    """
+    Converts an XML dump into a sequence of reverts.  Revisions are read
+    directly from :class:`mwxml.Page` and :class:`mwxml.Revision` objects and
+    only the fields that detection and `fields` need are converted into
+    revision documents.  See
+    :func:`~mwreverts.utilities.revdocs2reverts.revdocs2reverts` for the
+    other parameters.
+
+    :Params:
+        dump : :class:`mwxml.Dump` | `file`
+            an XML dump (or XML file) to process
+        use_sha1 : `bool`
+            Use the revision's sha1 as the checksum rather than hashing its
+            text.
+        fields : `iterable` ( `str` )
+            If set, only these fields of each revision are included in the
+            reverts.  Otherwise, complete revision documents are included.
+        stub : `bool`
+            Read `dump` as a stub dump file (see
+            :mod:`mwreverts.utilities.stub_reader`).  The sha1 of each
+            revision is used as its checksum.
+        path : `str`
+            The path of `dump`.  Required for `multistream_workers`.
+        multistream_workers : `int`
+            If greater than zero, `path` is read as a multistream dump with
+            this many processes and `dump` is ignored (see
+            :func:`~mwreverts.utilities.dump2reverts.multistream2reverts`).
+    """
+    fields = list(fields) if fields is not None else None
+    if multistream_workers > 0:
+        if not isinstance(path, str):
+            raise ValueError("Multistream dumps must be read from a path")
+        return multistream2reverts(path, workers=multistream_workers,
+                                   use_sha1=use_sha1, fields=fields,
+                                   stub=stub, **kwargs)
+    elif stub:
+        if isinstance(dump, mwxml.Dump):
+            raise TypeError("Stub dumps must be provided as a file")
+        rev_docs = stub_reader.read_rev_docs(dump, fields)
+        use_sha1 = True
+    else:
+        if not isinstance(dump, mwxml.Dump):
+            dump = mwxml.Dump.from_file(dump)
+        rev_docs = dump_rev_docs(dump, use_sha1, fields)
+    return revdocs2reverts(rev_docs, use_sha1=use_sha1, fields=fields,
+                           **kwargs)
+
+
+def dump_rev_docs(dump, use_sha1, fields):
+    """
+    Generates a page-partitioned sequence of revision documents containing
+    the `page`, `id` and `timestamp` of each revision, its `text` (or `sha1`
+    if `use_sha1` is set) and `fields`.  If `fields` is `None`, complete
+    revision documents are generated with the text at the top level only.
+    """
+    checksum_field = 'sha1' if use_sha1 else 'text'
+    if fields is not None:
+        fields = [field for field in fields
+                  if field not in ('page', 'id', 'timestamp', checksum_field)]
+
+    for page in dump:
+        page_doc = None
+        for revision in page:
+            if page_doc is None:
+                page_doc = revision.page.to_json()
+
+            if fields is None:
+                rev_doc = revision.to_json()
+            else:
+                rev_doc = {}
+                for field in fields:
+                    value = getattr(revision, field, None)
+                    if value is not None:
+                        rev_doc[field] = value.to_json() \
+                            if hasattr(value, 'to_json') else value
+
+            rev_doc['page'] = page_doc
+            rev_doc['id'] = revision.id
+            if revision.timestamp is not None:
+                rev_doc['timestamp'] = revision.timestamp.long_format()
+            checksum_source = getattr(revision, checksum_field)
+            if checksum_source is not None:
+                rev_doc[checksum_field] = checksum_source
+            if fields is None and 'text' in rev_doc:
+                drop_slot_text(rev_doc)
+
+            yield rev_doc
+
+
+def drop_slot_text(rev_doc):
+    """
+    Removes the text of the main slot (mwxml >= 0.3) from a complete revision
+    document so that the text is only held once, as `text`.
+    """
+    slots = rev_doc.get('slots') or {}
+    main = (slots.get('contents') or {}).get('main')
+    if main is not None:
+        main.pop('text', None)
+
+
+def multistream2reverts(path, index=None, workers=None,
+                        streams_per_chunk=multistream.STREAMS_PER_CHUNK,
+                        stats=None, progress=None, verbose=False, **kwargs):
+    """
+    Converts a multistream bz2 dump into a sequence of reverts.  The dump's
+    page streams are grouped into chunks that are decompressed, parsed and
+    processed in a pool of processes (see
+    :mod:`mwreverts.utilities.multistream`).  Reverts are generated in page
+    order.
+
+    :Params:
+        path : `str`
+            the path to a ``*-multistream.xml.bz2`` dump
+        index : `str`
+            the path to the dump's stream index [default: next to `path`]
+        workers : `int`
+            the number of processes to use [default: <cpu_count>]
+        streams_per_chunk : `int`
+            the number of page streams to process at a time in a worker
+        stats : :class:`mwreverts.utilities.stats.Stats`
+            If set, counters and per-stage timings are added to this object.
+        progress : :class:`mwreverts.utilities.progress.Progress`
+            If set, progress is reported here
+        verbose : `bool`
+            Print a throttled status line of progress to stderr (if `progress`
+            isn't set)
+        kwargs
+            Passed to :func:`~mwreverts.utilities.dump2reverts.dump2reverts`
+            for each chunk.  `state` and `page_workers` are not supported and
+            `sidecar` must be a path.
+    """
+    if kwargs.get('state') is not None or kwargs.get('page_workers', 0) > 0:
+        raise ValueError("Multistream dumps can't be read with state or " +
+                         "page_workers")
+    elif not isinstance(kwargs.get('sidecar') or "", str):
+        raise ValueError("Multistream dumps require a sidecar path")
+
+    offsets = multistream.read_offsets(index or multistream.index_path(path))
+    header = multistream.read_header(path, offsets)
+    chunks = multistream.chunk_streams(offsets, os.path.getsize(path),
+                                       streams_per_chunk)
+
+    stats = stats if stats is not None else Stats()
+    own_progress = progress is None and verbose
+    if own_progress:
+        progress = Progress()
+
+    process_chunk = partial(_process_chunk, path=path, header=header,
+                            kwargs=kwargs)
+    try:
+        for revert_docs, chunk_stats in \
+                map_pages(process_chunk, chunks, workers=workers):
+            stats.merge(chunk_stats)
+            for revert_doc in revert_docs:
+                start = time.perf_counter()
+                yield revert_doc
+                stats.time('output', time.perf_counter() - start)
+
+            if progress is not None:
+                progress.tick(stats)
+    finally:
+        if own_progress:
+            progress.tick(stats, force=True)
+            progress.close()
+
+
+def _process_chunk(chunk, path, header, kwargs):
+    # Processes a chunk of page streams in a worker process.  Returns the
+    # chunk's revert documents and stats.
+    start, end = chunk
+    stats = Stats()
+    read_start = time.perf_counter()
+    xml = multistream.read_chunk(path, header, start, end)
+    stats.time('read', time.perf_counter() - read_start)
+    stats.count('bytes_read', end - start)
 
+    revert_docs = list(dump2reverts(io.StringIO(xml), stats=stats, **kwargs))
+    return revert_docs, stats
 
-def dump2reverts(dump, **kwargs):
-    docs = mwxml.utilities.dump2revdocs(dump)
-    return revdocs2reverts(docs, **kwargs)
 
-streamer = mwcli.Streamer(
+streamer = Streamer(
     __doc__,
     __name__,
     dump2reverts,
     process_args,
-    file_reader=mwxml.Dump.from_file
+    file_reader=read_lines,
+    pass_path=True,
+    pool_kwargs=['page_workers', 'multistream_workers']
 )
 
 main = streamer.main
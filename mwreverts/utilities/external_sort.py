@@ -0,0 +1,109 @@
+"""
+Sorts sequences of revision documents that may not fit in memory.  Documents
+are buffered until the buffer exceeds a memory cap.  Then each buffer is
+sorted and spilled to a temporary file as a sorted run, and the runs are
+merged with a heap.  Sequences that fit within the cap are sorted in memory.
+
+.. autofunction:: mwreverts.utilities.external_sort.sort_rev_docs
+"""
+import heapq
+import pickle
+import tempfile
+from itertools import count
+
+SORT_BUFFER = 256 * 2 ** 20
+"""
+The default approximate number of bytes of revision documents to sort in
+memory
+"""
+
+DOC_OVERHEAD = 256
+"""
+The approximate number of bytes a revision document occupies in addition to
+the length of its string fields
+"""
+
+
+def sort_rev_docs(rev_docs, key, sort_buffer=SORT_BUFFER):
+    """
+    Generates `rev_docs` in order of `key`.  The sort is stable.
+
+    :Parameters:
+        rev_docs : `iterable` ( `dict` )
+            revision documents to sort.  Documents must be
+            :mod:`pickle`-able.
+        key : `func`
+            a function that returns a sort key for a revision document
+        sort_buffer : `int`
+            the approximate number of bytes of revision documents to hold in
+            memory before spilling a sorted run to disk
+    """
+    buffer, buffer_size = [], 0
+    spill = None
+
+    try:
+        for rev_doc in rev_docs:
+            buffer.append(rev_doc)
+            buffer_size += doc_size(rev_doc)
+            if buffer_size > sort_buffer:
+                spill = spill or _Spill()
+                spill.write_run(buffer, key)
+                buffer, buffer_size = [], 0
+
+        if spill is None:
+            yield from sorted(buffer, key=key)
+        else:
+            if len(buffer) > 0:
+                spill.write_run(buffer, key)
+                del buffer
+            yield from spill.merge()
+    finally:
+        if spill is not None:
+            spill.close()
+
+
+def doc_size(rev_doc):
+    """
+    Approximates the memory occupied by a revision document.
+    """
+    return DOC_OVERHEAD + sum(len(value) for value in rev_doc.values()
+                              if isinstance(value, str))
+
+
+class _Spill:
+    """
+    A temporary file of sorted runs.  Each run is a contiguous region of
+    pickled (key, sequence, rev_doc) records.
+    """
+    def __init__(self):
+        self.f = tempfile.TemporaryFile()
+        self.runs = []
+        self.sequence = count()
+
+    def write_run(self, rev_docs, key):
+        # The sequence number keeps the merge stable and prevents documents
+        # with equal keys from being compared.
+        records = sorted(((key(rev_doc), next(self.sequence), rev_doc)
+                          for rev_doc in rev_docs),
+                         key=lambda record: record[:2])
+        start = self.f.tell()
+        for record in records:
+            pickle.dump(record, self.f, pickle.HIGHEST_PROTOCOL)
+        self.runs.append((start, self.f.tell()))
+
+    def merge(self):
+        runs = [self._read_run(start, end) for start, end in self.runs]
+        for _, _, rev_doc in heapq.merge(*runs,
+                                         key=lambda record: record[:2]):
+            yield rev_doc
+
+    def _read_run(self, start, end):
+        offset = start
+        while offset < end:
+            self.f.seek(offset)
+            record = pickle.load(self.f)
+            offset = self.f.tell()
+            yield record
+
+    def close(self):
+        self.f.close()
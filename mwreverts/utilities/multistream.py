@@ -0,0 +1,124 @@
+"""
+Reads multistream bz2 XML dumps (``*-multistream.xml.bz2``).  A multistream
+dump is a concatenation of independent bz2 streams: a header stream
+(``<mediawiki>`` and ``<siteinfo>``), streams of (about 100) whole pages and
+a footer stream (``</mediawiki>``).  An accompanying index
+(``*-multistream-index.txt.bz2``) lists the byte offset of the stream that
+contains each page as ``offset:page_id:title`` lines.
+
+The streams can be read independently, so a dump can be split into chunks
+of page-aligned streams that are decompressed and parsed in parallel.
+
+.. autofunction:: mwreverts.utilities.multistream.index_path
+
+.. autofunction:: mwreverts.utilities.multistream.read_offsets
+
+.. autofunction:: mwreverts.utilities.multistream.chunk_streams
+
+.. autofunction:: mwreverts.utilities.multistream.read_header
+
+.. autofunction:: mwreverts.utilities.multistream.read_chunk
+"""
+import bz2
+
+STREAMS_PER_CHUNK = 4
+"""
+The default number of page streams to process in a chunk
+"""
+
+FOOTER = "</mediawiki>"
+
+
+def index_path(dump_path):
+    """
+    Finds the path of the index of a multistream dump.
+    ``<name>-multistream.xml.bz2`` is indexed by
+    ``<name>-multistream-index.txt.bz2``.
+    """
+    if not dump_path.endswith(".xml.bz2"):
+        raise ValueError("{0} is not a multistream bz2 dump"
+                         .format(repr(dump_path)))
+    return dump_path[:-len(".xml.bz2")] + "-index.txt.bz2"
+
+
+def read_offsets(path):
+    """
+    Reads the distinct stream offsets from a multistream index.
+
+    :Parameters:
+        path : `str`
+            the path to an index file (optionally bz2-compressed)
+
+    :Returns:
+        A sorted `list` of byte offsets
+    """
+    if path.endswith(".bz2"):
+        f = bz2.open(path, "rt", encoding="utf-8", errors="replace")
+    else:
+        f = open(path, "rt", encoding="utf-8", errors="replace")
+
+    with f:
+        offsets = {int(line.split(":", 1)[0]) for line in f if line.strip()}
+
+    return sorted(offsets)
+
+
+def chunk_streams(offsets, size, streams_per_chunk=STREAMS_PER_CHUNK):
+    """
+    Groups page streams into chunks of contiguous bytes.
+
+    :Parameters:
+        offsets : `list` ( `int` )
+            the sorted stream offsets of the dump's pages
+        size : `int`
+            the size of the dump file in bytes
+        streams_per_chunk : `int`
+            the number of streams to group into a chunk
+
+    :Returns:
+        A `list` of (start, end) byte ranges.  The last range ends at `size`
+        and so includes the footer stream.
+    """
+    starts = offsets[::streams_per_chunk]
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def read_header(path, offsets):
+    """
+    Decompresses the header stream of a multistream dump.
+
+    :Returns:
+        The XML that precedes the first page as a `str`
+    """
+    with open(path, "rb") as f:
+        data = f.read(offsets[0])
+    return bz2.decompress(data).decode("utf-8", "replace")
+
+
+def read_chunk(path, header, start, end):
+    """
+    Decompresses a chunk of page streams into a complete XML document.
+
+    :Parameters:
+        path : `str`
+            the path to the dump file
+        header : `str`
+            the dump's header (see
+            :func:`~mwreverts.utilities.multistream.read_header`)
+        start : `int`
+            the offset of the first stream in the chunk
+        end : `int`
+            the offset after the last stream in the chunk
+
+    :Returns:
+        the XML of the chunk's pages wrapped in the dump's header and footer
+        as a `str`
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    pages = bz2.decompress(data).decode("utf-8", "replace").rstrip()
+    if pages.endswith(FOOTER):
+        pages = pages[:-len(FOOTER)]
+
+    return header + pages + "\n" + FOOTER + "\n"
@@ -0,0 +1,128 @@
+"""
+Reports progress on a single, periodically rewritten status line.  Counts
+are read from a :class:`~mwreverts.utilities.stats.Stats` and are aggregated
+across all of the processes that share a
+:class:`~mwreverts.utilities.progress.Progress` (it must be constructed
+before the processes are forked).
+
+.. autoclass:: mwreverts.utilities.progress.Progress
+    :members:
+
+.. autoclass:: mwreverts.utilities.progress.CountingReader
+"""
+import multiprocessing
+import sys
+import time
+
+INTERVAL = 0.5
+"""
+The default minimum number of seconds between status line updates
+"""
+
+COUNTERS = ('pages', 'revisions', 'reverts', 'bytes_read')
+
+START, LAST_REPORT = len(COUNTERS), len(COUNTERS) + 1
+
+
+class Progress:
+    """
+    Writes pages/sec, revisions/sec, reverts found and input consumed at
+    most once per `interval`.
+
+    :Parameters:
+        f : `file`
+            where to write the status line [default: `sys.stderr`]
+        interval : `float`
+            the minimum number of seconds between updates
+    """
+    def __init__(self, f=None, interval=INTERVAL):
+        self.f = f
+        self.interval = float(interval)
+        self.shared = multiprocessing.Array('d', len(COUNTERS) + 2)
+        self.shared[START] = time.time()
+
+        # Process-local state.  Forked processes get their own copy.
+        self.stats = None
+        self.published = [0] * len(COUNTERS)
+        self.next_check = 0.0
+
+    def tick(self, stats, force=False):
+        """
+        Publishes the counts of `stats` (if `interval` has passed since the
+        last time this process published) and updates the status line if no
+        process has done so within `interval`.
+        """
+        now = time.monotonic()
+        if now < self.next_check and not force:
+            return
+        self.next_check = now + self.interval
+
+        if stats is not self.stats:
+            self.stats, self.published = stats, [0] * len(COUNTERS)
+        counts = [stats.counts.get(name, 0) for name in COUNTERS]
+        deltas = [count - published
+                  for count, published in zip(counts, self.published)]
+        self.published = counts
+
+        with self.shared.get_lock():
+            for i, delta in enumerate(deltas):
+                self.shared[i] += delta
+
+            now = time.time()
+            if now - self.shared[LAST_REPORT] >= self.interval:
+                self.shared[LAST_REPORT] = now
+                self._write("\r" + self.status(now))
+
+    def status(self, now=None):
+        """
+        Formats the status line.
+        """
+        now = now or time.time()
+        pages, revisions, reverts, bytes_read = self.shared[:len(COUNTERS)]
+        elapsed = max(now - self.shared[START], 1e-9)
+        return ("{0:,.0f} pages ({1:,.1f}/s), {2:,.0f} revisions " +
+                "({3:,.0f}/s), {4:,.0f} reverts, {5:,.1f} MB read " +
+                "({6:,.1f} MB/s)").format(
+                    pages, pages / elapsed, revisions, revisions / elapsed,
+                    reverts, bytes_read / 2 ** 20,
+                    bytes_read / 2 ** 20 / elapsed)
+
+    def close(self):
+        """
+        Writes the final status line.
+        """
+        with self.shared.get_lock():
+            self._write("\r" + self.status() + "\n")
+
+    def _write(self, line):
+        f = self.f or sys.stderr
+        f.write(line)
+        f.flush()
+
+
+class CountingReader:
+    """
+    Wraps a file and counts the characters (or bytes) read from it as
+    `bytes_read` in a :class:`~mwreverts.utilities.stats.Stats`.
+    """
+    def __init__(self, f, stats):
+        self.f = f
+        self.stats = stats
+
+    def read(self, *args):
+        data = self.f.read(*args)
+        self.stats.count('bytes_read', len(data))
+        return data
+
+    def readline(self, *args):
+        line = self.f.readline(*args)
+        self.stats.count('bytes_read', len(line))
+        return line
+
+    def __iter__(self):
+        for line in self.f:
+            self.stats.count('bytes_read', len(line))
+            yield line
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
@@ -7,117 +7,583 @@
 
     Usage:
         revdocs2reverts (-h|--help)
-        revdocs2reverts [<input-file>...] [--radius=<revs>] [--use-sha1] [--resort]
-                        [--threads=<num>] [--output=<path>] [--compress=<type>]
-                        [--verbose] [--debug]
+        revdocs2reverts [<input-file>...] [--radius=<revs>] [--use-sha1]
+                        [--resort] [--sort-buffer=<MB>] [--fields=<names>]
+                        [--selective-decode] [--state=<path>]
+                        [--sidecar=<path>] [--hash=<name>]
+                        [--hash-threads=<num>] [--page-workers=<num>]
+                        [--chunk-size=<revs>]
+                        [--threads=<num>] [--output=<path>]
+                        [--format=<type>] [--compress=<type>] [--stats=<path>]
+                        [--verbose] [--progress-interval=<ms>] [--debug]
 
     Options:
         -h|--help           Print this documentation
         <input-file>        The path to file containing page-partitioned
                             JSON revision documents. [default: <stdin>]
         --radius=<revs>     The maximum number of revisions that a revert can
-                            reference. [default: 15]
+                            reference.  If a comma-separated list of radii is
+                            provided (e.g. "5,15,50"), detection runs once
+                            with the largest and each revert is tagged with
+                            the smallest radius that detects it. [default: 15]
         --use-sha1          Use the sha1 field even if a text field is
                             available.
         --resort            Re-sort the revisions within a page by timestamp
                             and rev_id.
+        --sort-buffer=<MB>  When re-sorting, the approximate amount of
+                            revision data to hold in memory.  Larger pages
+                            are sorted in runs that are spilled to temporary
+                            files and merged. [default: 256]
+        --fields=<names>    A comma-separated list of revision document fields
+                            to include in the reverts (e.g.
+                            "id,timestamp,user,sha1").  [default: <all>]
+        --selective-decode  With --fields, decode only those fields and the
+                            ones needed for detection from each line and
+                            skip past the rest.  This is slower than full
+                            decoding unless large values (e.g. text with
+                            --use-sha1) are skipped.  Requires --fields.
+        --state=<path>      The path to a SQLite file of per-page history
+                            tails.  Detection resumes from the stored tail of
+                            each page and only reverts involving new revisions
+                            are emitted.  The file is updated as pages are
+                            processed.  Revision text isn't stored, so
+                            stored revisions appear in reverts without it.
+        --sidecar=<path>    Append the page, rev_id, timestamp and checksum of
+                            every revision processed to a sidecar file that
+                            `mwreverts sidecar2reverts` can re-run detection
+                            from.  Use a ".gz" or ".bz2" extension to
+                            compress it.  [default: <none>]
+        --hash=<name>       The function that revision text is hashed with:
+                            "sha1", "blake2b" (64 bit) or "crc32" (32 bit).
+                            Shorter hashes are faster and use less memory,
+                            but risk false reverts when distinct texts
+                            collide (see mwreverts.hashers). [default: sha1]
+        --hash-threads=<num>
+                            Hash revision text ahead of detection in a pool of
+                            this many threads.  hashlib releases the GIL, so
+                            this helps with large texts. [default: 0]
+        --page-workers=<num>
+                            Detect reverts in a pool of this many processes,
+                            one page at a time.  This can't be combined
+                            with --state.  Input files are then processed
+                            one at a time rather than by --threads
+                            processes. [default: 0]
+        --chunk-size=<revs>
+                            When processing pages in a pool of processes,
+                            split pages into chunks of this many revisions
+                            so that long histories are processed in
+                            parallel.  Each chunk is preceded by the radius
+                            + 1 revisions before it, so the reverts are the
+                            same as without chunking.
+                            [default: <none>]
         --threads=<num>     If a collection of files are provided, how many
-                            processor threads? [default: <cpu_count>]
+                            processor threads?  Files are processed
+                            largest-first. [default: <cpu_count>]
         --output=<path>     Write output to a directory with one output file
                             per input path.  [default: <stdout>]
+        --format=<type>     The output format.  "json" writes a JSON line per
+                            revert.  "npz" writes integer columns to a NumPy
+                            archive (see mwreverts.utilities.columnar).
+                            [default: json]
         --compress=<type>   If set, output written to the output-dir will be
-                            compressed in this format. [default: bz2]
-        --verbose           Print progress information to stderr.
+                            compressed in this format.  The npz format is
+                            zlib-compressed unless this is "plaintext".
+                            [default: bz2]
+        --stats=<path>      Write counters and per-stage timings (reading,
+                            hashing, detection, serialization and output) to
+                            this path as JSON.  The statistics of all input
+                            files are merged.  [default: <none>]
+        --verbose           Print a status line of progress (pages, revisions
+                            and reverts processed, input consumed and rates)
+                            to stderr.
+        --progress-interval=<ms>
+                            How often the status line is updated in
+                            milliseconds. [default: 500]
         --debug             Print debug logs.
 """
-import hashlib
+import json
 import logging
-import sys
-from itertools import groupby
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import groupby, islice
 
-import mwcli
-
-from .. import defaults
+from .. import defaults, hashers
 from ..detector import Detector
 from ..dummy_checksum import DummyChecksum
+from ..parallel import chunk_history, map_pages
+from ..sidecar import WIDTH as SIDECAR_WIDTH
+from ..sidecar import Writer as SidecarWriter
+from ..tail_store import TailStore
+from . import selective_json
+from .external_sort import SORT_BUFFER, sort_rev_docs
+from .progress import Progress
+from .stats import Stats, timed
+from .streamer import Streamer
 
 logger = logging.getLogger(__name__)
 
+LOOKAHEAD_PER_THREAD = 4
+"""
+How many revision documents to hash ahead of detection per hashing thread
+"""
+
 
 def process_args(args):
 
-    return {'radius': int(args['--radius']),
+    if args['--fields'] == "<all>":
+        fields = None
+    else:
+        fields = [field.strip() for field in args['--fields'].split(",")]
+
+    if args.get('--selective-decode') and fields is None:
+        raise ValueError("--selective-decode requires --fields")
+
+    return {'radius': parse_radius(args['--radius']),
             'use_sha1': bool(args['--use-sha1']),
-            'resort': bool(args['--resort'])}
+            'resort': bool(args['--resort']),
+            'sort_buffer': int(float(args['--sort-buffer']) * 2 ** 20),
+            'fields': fields,
+            'selective_decode': bool(args.get('--selective-decode')),
+            'state': args['--state'],
+            'sidecar': args['--sidecar']
+            if args['--sidecar'] != "<none>" else None,
+            'hasher': args['--hash'],
+            'hash_threads': int(args['--hash-threads']),
+            'page_workers': int(args['--page-workers']),
+            'chunk_size': int(args['--chunk-size'])
+            if args['--chunk-size'] != "<none>" else None}
+
+
+def parse_radius(value):
+    radii = [int(radius) for radius in value.split(",")]
+    return radii[0] if len(radii) == 1 else radii
 
 
 def revdocs2reverts(rev_docs, radius=defaults.RADIUS, use_sha1=False,
-                    resort=False, verbose=False):
+                    resort=False, sort_buffer=SORT_BUFFER, fields=None,
+                    selective_decode=False, state=None, sidecar=None,
+                    hasher='sha1', hash_threads=0, page_workers=0,
+                    chunk_size=None, stats=None, progress=None,
+                    verbose=False):
     """
     Converts a sequence of page-partitioned revision documents into a sequence
     of reverts.
 
     :Params:
-        rev_docs : `iterable` ( `dict` )
-            a page-partitioned sequence of revision documents
-        radius : `int`
-            The maximum number of revisions that a revert can reference.
+        rev_docs : `iterable` ( `dict` | `str` )
+            a page-partitioned sequence of revision documents.  Documents
+            may be provided as undecoded JSON strings.
+        radius : `int` | `list` ( `int` )
+            The maximum number of revisions that a revert can reference.  If
+            a list of radii is provided, each revert is tagged with the
+            smallest radius that detects it (see :class:`mwreverts.Detector`).
         use_sha1 : `bool`
             Use the sha1 field as the checksum for comparison.
         resort : `bool`
             If True, re-sort the revisions of each page.
+        sort_buffer : `int`
+            When re-sorting, the approximate number of bytes of revision
+            documents to sort in memory.  Pages that exceed this are sorted
+            on disk (see :mod:`mwreverts.utilities.external_sort`).
+        fields : `iterable` ( `str` )
+            If set, revision documents are projected to these fields before
+            they enter the detector's history (and thus the reverts).
+        selective_decode : `bool`
+            If True, only the fields needed for detection and projection
+            are decoded from JSON strings (see
+            :mod:`mwreverts.utilities.selective_json`).  This only pays off
+            when large values are skipped.  Requires `fields`.
+        state : `str` | :class:`mwreverts.tail_store.TailStore`
+            A store of per-page history tails.  If set, each page's detector
+            is seeded from the store, revisions that precede the stored tail
+            are skipped and the store is updated.  A tail stored with a
+            different radius or kind of checksum (`use_sha1` or `hasher`)
+            is not used; the page's old revisions are reprocessed instead.
+            Revision documents are stored without their `text` (see
+            :class:`~mwreverts.tail_store.TailStore`), so unless `fields`
+            excludes `text`, reverts that reference stored revisions differ
+            from a single pass in that those revisions lack `text`.
+        sidecar : `str` | :class:`mwreverts.sidecar.Writer`
+            If set, a block of (rev_id, timestamp, checksum) records is
+            appended to this sidecar for each page processed.
+        hasher : `str` | `func`
+            The name of a function in :data:`mwreverts.hashers.HASHERS` or a
+            function that returns a checksum for the `bytes` of revision
+            text.  Ignored if `use_sha1` is set.
+        hash_threads : `int`
+            If greater than zero, revision text is hashed ahead of detection
+            in a pool of this many threads.
+        page_workers : `int`
+            If greater than zero, pages are processed in a pool of this many
+            processes (see :func:`mwreverts.parallel.map_pages`).  Revision
+            documents must be :mod:`pickle`-able.  `hash_threads` is ignored
+            and `state` is not supported.
+        chunk_size : `int`
+            If set (with `page_workers`), pages are split into chunks of this
+            many revisions that are processed in parallel (see
+            :func:`mwreverts.parallel.chunk_history`).  The reverts are the
+            same as without chunking.
+        stats : :class:`mwreverts.utilities.stats.Stats`
+            If set, counters and per-stage timings are added to this object.
+        progress : :class:`mwreverts.utilities.progress.Progress`
+            If set, progress is reported here
         verbose : `bool`
-            Print dots and stuff
+            Print a throttled status line of progress to stderr (if `progress`
+            isn't set)
     """
 
+    if page_workers > 0 and state is not None:
+        raise ValueError("page_workers can't be combined with state")
+    elif selective_decode and fields is None:
+        raise ValueError("selective_decode requires fields")
+
+    if isinstance(state, str):
+        store = TailStore(state)
+    else:
+        store = state
+
+    if isinstance(hasher, str):
+        width = hashers.DIGEST_WIDTHS[hasher]
+        hasher = hashers.HASHERS[hasher]
+    else:
+        width = SIDECAR_WIDTH
+
+    if isinstance(sidecar, str):
+        sidecar_writer = SidecarWriter.from_path(
+            sidecar, width=width if not use_sha1 else SIDECAR_WIDTH)
+    else:
+        sidecar_writer = sidecar
+
+    fields = list(fields) if fields is not None else None
+    stats = stats if stats is not None else Stats()
+    own_progress = progress is None and verbose
+    if own_progress:
+        progress = Progress()
+
+    if hash_threads > 0 and not use_sha1 and page_workers == 0:
+        executor = ThreadPoolExecutor(max_workers=hash_threads)
+    else:
+        executor = None
+
+    rev_docs = decode_rev_docs(rev_docs, use_sha1,
+                               fields if selective_decode else None)
+    try:
+        yield from _revdocs2reverts(rev_docs, radius, use_sha1, hasher,
+                                    sort_buffer if resort else None,
+                                    fields, store, sidecar_writer, executor,
+                                    hash_threads * LOOKAHEAD_PER_THREAD,
+                                    page_workers, chunk_size, stats,
+                                    progress)
+    finally:
+        if own_progress:
+            progress.tick(stats, force=True)
+            progress.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if store is not None and store is not state:
+            store.close()
+        elif store is not None:
+            store.commit()
+        if sidecar_writer is not None and sidecar_writer is not sidecar:
+            sidecar_writer.close()
+
+
+def project(rev_doc, fields):
+    return {field: rev_doc[field] for field in fields if field in rev_doc}
+
+
+def checksum_kind(use_sha1, hasher):
+    """
+    Names the kind of checksums that are produced for revision documents so
+    that stored tails are only resumed with matching checksums.
+    """
+    if use_sha1:
+        return "sha1 field"
+    else:
+        return "{0}.{1}".format(hasher.__module__, hasher.__qualname__)
+
+
+def hash_text(text, hasher=hashers.sha1):
+    text_bytes = bytes(text, 'utf8', 'replace')
+    return hasher(text_bytes), len(text_bytes)
+
+
+def decode_rev_docs(rev_docs, use_sha1, fields):
+    """
+    Decodes revision documents that are provided as JSON strings.  If
+    `fields` is set, only the fields that detection and projection need are
+    decoded with :func:`mwreverts.utilities.selective_json.loads`.
+    """
+    if fields is None:
+        keys = None
+    else:
+        keys = set(fields) | {'page', 'id', 'timestamp',
+                              'sha1' if use_sha1 else 'text'}
+
+    for rev_doc in rev_docs:
+        if not isinstance(rev_doc, str):
+            yield rev_doc
+        elif keys is None:
+            yield json.loads(rev_doc)
+        else:
+            yield selective_json.loads(rev_doc, keys)
+
+
+def read_lines(f):
+    return f
+
+
+def checksum_rev_docs(rev_docs, use_sha1, stats, executor=None,
+                      lookahead=None, hasher=hashers.sha1):
+    """
+    Generates (checksum, rev_doc) pairs.  Revision documents without the
+    necessary fields are skipped.  Text is hashed with `hasher`.  If an
+    `executor` is provided, text is hashed in its threads up to `lookahead`
+    revisions ahead of the revision being consumed.
+    """
+    pending = deque() if executor is not None else None
+
+    for rev_doc in rev_docs:
+        if use_sha1:
+            yield rev_doc.get('sha1') or None, rev_doc
+        elif 'text' not in rev_doc:
+            logger.warn("Skipping {0}: 'text' field not found in {1}"
+                        .format(rev_doc['id'], rev_doc))
+        elif executor is not None:
+            pending.append(
+                (executor.submit(hash_text, rev_doc['text'], hasher),
+                 rev_doc))
+            if len(pending) >= lookahead:
+                yield _resolve(pending.popleft(), stats)
+        else:
+            start = time.perf_counter()
+            checksum, n_bytes = hash_text(rev_doc['text'], hasher)
+            stats.time('hash', time.perf_counter() - start)
+            stats.count('bytes_hashed', n_bytes)
+            yield checksum, rev_doc
+
+    while pending:
+        yield _resolve(pending.popleft(), stats)
+
+
+def _resolve(pending_rev_doc, stats):
+    future, rev_doc = pending_rev_doc
+    start = time.perf_counter()
+    checksum, n_bytes = future.result()
+    stats.time('hash', time.perf_counter() - start)
+    stats.count('bytes_hashed', n_bytes)
+    return checksum, rev_doc
+
+
+def _revdocs2reverts(rev_docs, radius, use_sha1, hasher, sort_buffer, fields,
+                     store, sidecar, executor, lookahead, page_workers,
+                     chunk_size, stats, progress):
+    rev_docs = timed(rev_docs, stats, 'read')
     page_rev_docs = groupby(rev_docs, lambda rd: rd.get('page'))
 
+    if page_workers > 0:
+        yield from _parallel_revdocs2reverts(
+            page_rev_docs, radius, use_sha1, hasher, sort_buffer, fields,
+            sidecar, page_workers, chunk_size, stats, progress)
+        return
+
     for page_doc, rev_docs in page_rev_docs:
-        if verbose:
-            sys.stderr.write(page_doc.get('title') + ": ")
-            sys.stderr.flush()
-
-        if resort:
-            if verbose:
-                sys.stderr.write("(sorting) ")
-                sys.stderr.flush()
-            rev_docs = sorted(
-                rev_docs, key=lambda r: (r.get('timestamp'), r.get('id')))
-
-        detector = Detector(radius=radius)
-        for rev_doc in rev_docs:
-            if not use_sha1 and 'text' not in rev_doc:
-                logger.warn("Skipping {0}: 'text' field not found in {0}"
-                            .format(rev_doc['id'], rev_doc))
-                continue
-
-            if use_sha1:
-                checksum = rev_doc.get('sha1') or DummyChecksum()
-            elif 'text' in rev_doc:
-                text_bytes = bytes(rev_doc['text'], 'utf8', 'replace')
-                checksum = hashlib.sha1(text_bytes).digest()
-
-            revert = detector.process(checksum, rev_doc)
-
-            if revert:
-                yield revert.to_json()
-                if verbose:
-                    sys.stderr.write("r")
-                    sys.stderr.flush()
+        records = [] if sidecar is not None else None
+        yield from _page_reverts(page_doc, rev_docs, radius, use_sha1,
+                                 hasher, sort_buffer, fields, store, records,
+                                 executor, lookahead, stats, progress)
+        if sidecar is not None:
+            sidecar.write_page(page_doc['id'], records)
+
+
+def _parallel_revdocs2reverts(page_rev_docs, radius, use_sha1, hasher,
+                              sort_buffer, fields, sidecar, page_workers,
+                              chunk_size, stats, progress):
+    if chunk_size is None:
+        chunks = ((page_doc, 0, list(rev_docs))
+                  for page_doc, rev_docs in page_rev_docs)
+    else:
+        # Pages are sorted (and revisions without a checksum are dropped)
+        # before they are chunked so that the overlaps are exact.
+        chunks = (chunk for page_doc, rev_docs in page_rev_docs
+                  for chunk in _page_chunks(
+                      page_doc,
+                      _checksummable(
+                          sort_rev_docs(rev_docs, key=_sort_key,
+                                        sort_buffer=sort_buffer)
+                          if sort_buffer is not None else rev_docs,
+                          use_sha1),
+                      radius, chunk_size))
+        sort_buffer = None
+
+    process_chunk = partial(_process_chunk, radius=radius, use_sha1=use_sha1,
+                            hasher=hasher, sort_buffer=sort_buffer,
+                            fields=fields, keep_records=sidecar is not None)
+
+    # The records of a page's chunks are gathered into a single sidecar
+    # block.  A chunk without an overlap starts a new page.
+    page_id, page_records = None, []
+    for page_doc, revert_docs, records, chunk_stats, overlap in \
+            map_pages(process_chunk, chunks, workers=page_workers):
+        stats.merge(chunk_stats)
+        if sidecar is not None:
+            if overlap == 0 and page_id is not None:
+                sidecar.write_page(page_id, page_records)
+                page_records = []
+            page_id = page_doc['id']
+            page_records.extend(records)
+
+        for revert_doc in revert_docs:
+            start = time.perf_counter()
+            yield revert_doc
+            stats.time('output', time.perf_counter() - start)
+
+        if progress is not None:
+            progress.tick(stats)
+
+    if sidecar is not None and page_id is not None:
+        sidecar.write_page(page_id, page_records)
+
+
+def _page_chunks(page_doc, rev_docs, radius, chunk_size):
+    # Generates (page_doc, overlap, rev_docs) chunks of a page.  A page
+    # without any revisions left still gets an (empty) chunk so that it's
+    # counted and gets a sidecar block.
+    empty = True
+    for overlap, chunk in chunk_history(rev_docs, radius, chunk_size):
+        empty = False
+        yield page_doc, overlap, chunk
+
+    if empty:
+        yield page_doc, 0, []
+
+
+def _checksummable(rev_docs, use_sha1):
+    # Drops the revision documents that checksum_rev_docs() would skip
+    for rev_doc in rev_docs:
+        if use_sha1 or 'text' in rev_doc:
+            yield rev_doc
+        else:
+            logger.warn("Skipping {0}: 'text' field not found in {1}"
+                        .format(rev_doc['id'], rev_doc))
+
+
+def _sort_key(rev_doc):
+    return rev_doc.get('timestamp'), rev_doc.get('id')
+
+
+def _process_chunk(chunk, radius, use_sha1, hasher, sort_buffer, fields,
+                   keep_records):
+    # Processes a page (or a chunk of a page) in a worker process.  Returns
+    # the page and its revert documents along with the sidecar records,
+    # stats and overlap of the chunk.
+    page_doc, overlap, rev_docs = chunk
+    stats = Stats()
+    records = [] if keep_records else None
+    revert_docs = list(_page_reverts(page_doc, rev_docs, radius, use_sha1,
+                                     hasher, sort_buffer, fields, None,
+                                     records, None, None, stats, None,
+                                     overlap=overlap))
+    return page_doc, revert_docs, records, stats, overlap
+
+
+def _page_reverts(page_doc, rev_docs, radius, use_sha1, hasher, sort_buffer,
+                  fields, store, records, executor, lookahead, stats,
+                  progress, overlap=0):
+    if overlap == 0:
+        stats.count('pages')
+
+    if sort_buffer is not None:
+        rev_docs = sort_rev_docs(rev_docs, key=_sort_key,
+                                 sort_buffer=sort_buffer)
+
+    detector = Detector(radius=radius)
+    window_radius = detector.maxsize - 1
+    last, seeded, dirty = None, False, False
+    if store is not None:
+        kind = checksum_kind(use_sha1, hasher)
+        tail = store.load(page_doc['id'])
+        if tail is not None:
+            tail_radius, tail_detector, last, tail_kind = tail
+            if tail_kind != kind:
+                # The stored checksums can't match this run's, so the old
+                # revisions will be reprocessed.
+                logger.warning("Stored tail of page {0} has {1} checksums"
+                               .format(page_doc['id'], tail_kind))
+            elif tail_radius == window_radius and \
+                    tail_detector.radii == detector.radii:
+                detector, seeded = tail_detector, True
             else:
-                if verbose:
-                    sys.stderr.write(".")
-                    sys.stderr.flush()
+                # The stored tail can't seed this radius, so the old
+                # revisions will be reprocessed.
+                logger.warning("Stored tail of page {0} has radius {1}"
+                               .format(page_doc['id'],
+                                       tail_detector.radii or tail_radius))
+
+    if seeded:
+        rev_docs = (rev_doc for rev_doc in rev_docs
+                    if (rev_doc.get('timestamp'), rev_doc.get('id')) >
+                    last)
+
+    checksum_revisions = checksum_rev_docs(rev_docs, use_sha1, stats,
+                                           executor, lookahead, hasher)
+    # The first `overlap` revisions of a chunk only seed the detector
+    for checksum, rev_doc in islice(checksum_revisions, overlap):
+        if checksum is None:
+            checksum = DummyChecksum()  # Unknown checksums match nothing
+        detector.process(checksum, project(rev_doc, fields)
+                         if fields is not None else rev_doc)
+
+    for checksum, rev_doc in checksum_revisions:
+        is_old = last is not None and \
+            (rev_doc.get('timestamp'), rev_doc.get('id')) <= last
+
+        if records is not None:
+            records.append(
+                (rev_doc.get('id'), rev_doc.get('timestamp'), checksum))
+
+        if fields is not None:
+            revision = project(rev_doc, fields)
+        else:
+            revision = rev_doc
+
+        if checksum is None:
+            checksum = DummyChecksum()  # Unknown checksums match nothing
+        start = time.perf_counter()
+        revert = detector.process(checksum, revision)
+        stats.time('detect', time.perf_counter() - start)
+        stats.count('revisions')
+        if progress is not None:
+            progress.tick(stats)
+        dirty = True
+        if is_old:
+            revert = None  # Only reverts of new revisions are emitted
+        else:
+            last = (rev_doc.get('timestamp'), rev_doc.get('id'))
+
+        if revert:
+            start = time.perf_counter()
+            revert_doc = revert.to_json()
+            stats.time('serialize', time.perf_counter() - start)
+            stats.count('reverts')
+
+            start = time.perf_counter()
+            yield revert_doc
+            stats.time('output', time.perf_counter() - start)
+
+    if store is not None and dirty:
+        store.save(page_doc['id'], window_radius, detector, last, kind)
 
-        if verbose:
-            sys.stderr.write("\n")
-            sys.stderr.flush()
 
-streamer = mwcli.Streamer(
+streamer = Streamer(
     __doc__,
     __name__,
     revdocs2reverts,
-    process_args
+    process_args,
+    file_reader=read_lines,
+    pool_kwargs=['page_workers']
 )
 
 main = streamer.main
@@ -0,0 +1,109 @@
+"""
+Decodes selected top-level fields of JSON object documents.  The values of
+unselected fields are scanned past rather than decoded, so large values that
+aren't needed (e.g. revision text when comparing sha1s) cost little more than
+finding their closing quote.
+
+.. autofunction:: mwreverts.utilities.selective_json.loads
+"""
+import json
+import re
+from json.decoder import scanstring
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+MAX_ESCAPED_QUOTES = 8
+"""
+The number of escaped quotes to search past before a skipped string is
+scanned by :func:`json.decoder.scanstring` instead
+"""
+
+_scan_once = json.JSONDecoder().scan_once
+
+
+def loads(s, keys):
+    """
+    Decodes the fields of a JSON object document that appear in `keys`.
+    Decoding stops as soon as all `keys` have been found.
+
+    :Parameters:
+        s : `str`
+            a JSON object document (e.g. a line of a revision document file)
+        keys : `set` ( `str` )
+            the top-level fields to decode
+
+    :Returns:
+        A `dict` of the decoded fields.  Fields that do not appear in the
+        document are not included.
+
+    :Example:
+        >>> from mwreverts.utilities import selective_json
+        >>> selective_json.loads('{"id": 1, "text": "...", "page": {"id": 2}}',
+        ...                      {'id', 'page'})
+        {'id': 1, 'page': {'id': 2}}
+    """
+    doc = {}
+    pos = _skip_whitespace(s, 0)
+    if s[pos:pos + 1] != '{':
+        raise ValueError("Expecting '{{' at position {0}".format(pos))
+    pos = _skip_whitespace(s, pos + 1)
+    if s[pos:pos + 1] == '}':
+        return doc
+
+    while True:
+        if s[pos:pos + 1] != '"':
+            raise ValueError("Expecting property name at position {0}"
+                             .format(pos))
+        key, pos = scanstring(s, pos + 1)
+        pos = _skip_whitespace(s, pos)
+        if s[pos:pos + 1] != ':':
+            raise ValueError("Expecting ':' at position {0}".format(pos))
+        pos = _skip_whitespace(s, pos + 1)
+
+        if key in keys:
+            doc[key], pos = _scan_value(s, pos)
+            if len(doc) == len(keys):
+                return doc
+        elif s[pos:pos + 1] == '"':
+            pos = _skip_string(s, pos + 1)
+        else:
+            _, pos = _scan_value(s, pos)
+
+        pos = _skip_whitespace(s, pos)
+        delimiter = s[pos:pos + 1]
+        if delimiter == '}':
+            return doc
+        elif delimiter != ',':
+            raise ValueError("Expecting ',' delimiter at position {0}"
+                             .format(pos))
+        pos = _skip_whitespace(s, pos + 1)
+
+
+def _skip_whitespace(s, pos):
+    return WHITESPACE.match(s, pos).end()
+
+
+def _scan_value(s, pos):
+    try:
+        return _scan_once(s, pos)
+    except StopIteration:
+        raise ValueError("Expecting value at position {0}".format(pos))
+
+
+def _skip_string(s, pos):
+    # Finds the end of a string that starts at `pos` (after the opening
+    # quote).  A quote is escaped if it follows an odd number of backslashes.
+    # Strings with many escaped quotes are left to the (C) string scanner.
+    start = pos
+    for _ in range(MAX_ESCAPED_QUOTES + 1):
+        end = s.find('"', pos)
+        if end == -1:
+            break
+        backslash = end - 1
+        while s[backslash] == '\\':
+            backslash -= 1
+        if (end - backslash) % 2 == 1:
+            return end + 1
+        pos = end + 1
+
+    return scanstring(s, start)[1]
@@ -0,0 +1,144 @@
+"""
+``$ mwreverts sidecar2reverts -h``
+::
+
+    Extracts reverts from sidecar checksum files written with the --sidecar
+    option of dump2reverts or revdocs2reverts.  No revision text is read, so
+    this is a fast way to re-run detection with a different radius.
+
+    Usage:
+        sidecar2reverts (-h|--help)
+        sidecar2reverts [<input-file>...] [--radius=<revs>] [--threads=<num>]
+                        [--output=<path>] [--format=<type>] [--compress=<type>]
+                        [--stats=<path>] [--verbose]
+                        [--progress-interval=<ms>] [--debug]
+
+    Options:
+        -h|--help           Print this documentation
+        <input-file>        The path to a sidecar file.  Paths ending in
+                            ".gz" or ".bz2" are decompressed.
+                            [default: <stdin>]
+        --radius=<revs>     The maximum number of revisions that a revert can
+                            reference.  If a comma-separated list of radii is
+                            provided (e.g. "5,15,50"), detection runs once
+                            with the largest and each revert is tagged with
+                            the smallest radius that detects it. [default: 15]
+        --threads=<num>     If a collection of files are provided, how many
+                            processor threads?  Files are processed
+                            largest-first. [default: <cpu_count>]
+        --output=<path>     Write output to a directory with one output file
+                            per input path.  [default: <stdout>]
+        --format=<type>     The output format.  "json" writes a JSON line per
+                            revert.  "npz" writes integer columns to a NumPy
+                            archive (see mwreverts.utilities.columnar).
+                            [default: json]
+        --compress=<type>   If set, output written to the output-dir will be
+                            compressed in this format.  The npz format is
+                            zlib-compressed unless this is "plaintext".
+                            [default: bz2]
+        --stats=<path>      Write counters and per-stage timings (reading,
+                            detection, serialization and output) to this path
+                            as JSON.  The statistics of all input files are
+                            merged.  [default: <none>]
+        --verbose           Print a status line of progress (pages, revisions
+                            and reverts processed, input consumed and rates)
+                            to stderr.
+        --progress-interval=<ms>
+                            How often the status line is updated in
+                            milliseconds. [default: 500]
+        --debug             Print debug logs.
+
+The revisions in the reverts only contain an ``id``, ``timestamp`` and
+``page`` (with an ``id``).
+"""
+import time
+
+from mwtypes import Timestamp
+
+from .. import defaults, sidecar
+from ..detector import Detector
+from ..dummy_checksum import DummyChecksum
+from .progress import Progress
+from .revdocs2reverts import parse_radius
+from .stats import Stats, timed
+from .streamer import Streamer
+
+
+def process_args(args):
+    return {'radius': parse_radius(args['--radius'])}
+
+
+def sidecar2reverts(pages, radius=defaults.RADIUS, stats=None, progress=None,
+                    verbose=False):
+    """
+    Converts a sequence of sidecar page blocks into a sequence of reverts.
+
+    :Params:
+        pages : `iterable` ( (page_id, records) )
+            pages as read by :func:`mwreverts.sidecar.read`
+        radius : `int` | `list` ( `int` )
+            The maximum number of revisions that a revert can reference.  If
+            a list of radii is provided, each revert is tagged with the
+            smallest radius that detects it.
+        stats : :class:`mwreverts.utilities.stats.Stats`
+            If set, counters and per-stage timings are added to this object.
+        progress : :class:`mwreverts.utilities.progress.Progress`
+            If set, progress is reported here
+        verbose : `bool`
+            Print a throttled status line of progress to stderr (if `progress`
+            isn't set)
+    """
+    stats = stats if stats is not None else Stats()
+    own_progress = progress is None and verbose
+    if own_progress:
+        progress = Progress()
+
+    try:
+        yield from _sidecar2reverts(pages, radius, stats, progress)
+    finally:
+        if own_progress:
+            progress.tick(stats, force=True)
+            progress.close()
+
+
+def _sidecar2reverts(pages, radius, stats, progress):
+    for page_id, records in timed(pages, stats, 'read'):
+        stats.count('pages')
+        page_doc = {'id': page_id}
+        detector = Detector(radius=radius)
+
+        for rev_id, timestamp, digest in records:
+            revision = {'id': rev_id,
+                        'timestamp': Timestamp(timestamp).long_format()
+                        if timestamp is not None else None,
+                        'page': page_doc}
+
+            start = time.perf_counter()
+            revert = detector.process(
+                digest if digest is not None else DummyChecksum(), revision)
+            stats.time('detect', time.perf_counter() - start)
+            stats.count('revisions')
+            if progress is not None:
+                progress.tick(stats)
+
+            if revert:
+                start = time.perf_counter()
+                revert_doc = revert.to_json()
+                stats.time('serialize', time.perf_counter() - start)
+                stats.count('reverts')
+
+                start = time.perf_counter()
+                yield revert_doc
+                stats.time('output', time.perf_counter() - start)
+
+
+streamer = Streamer(
+    __doc__,
+    __name__,
+    sidecar2reverts,
+    process_args,
+    file_reader=sidecar.read,
+    binary=True
+)
+
+main = streamer.main
@@ -0,0 +1,69 @@
+"""
+Counters and cumulative timers that describe where a run spends its time.
+
+:Counters:
+    **pages** -- pages processed
+    **revisions** -- revisions processed
+    **bytes_hashed** -- bytes of text hashed to produce checksums
+    **bytes_read** -- characters (or bytes) read from input files
+    **reverts** -- reverts emitted
+
+:Timers (seconds):
+    **read** -- waiting on input (decompression, XML/JSON parsing, etc.)
+    **hash** -- hashing revision text
+    **detect** -- revert detection
+    **serialize** -- converting reverts to JSON documents
+    **output** -- waiting on the consumer of reverts (e.g. writing output)
+"""
+import time
+from collections import defaultdict
+
+import jsonable
+
+
+class Stats(jsonable.Type):
+    """
+    Collects counters and cumulative timers.  Stats collected by different
+    workers can be combined with
+    :func:`~mwreverts.utilities.stats.Stats.merge`.
+    """
+    __slots__ = ('counts', 'timers')
+
+    def initialize(self, counts=None, timers=None):
+        self.counts = defaultdict(int, counts or {})
+        self.timers = defaultdict(float, timers or {})
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def time(self, name, seconds):
+        self.timers[name] += seconds
+
+    def merge(self, other):
+        '''Adds the counts and timings of another `Stats` to this one.'''
+        for name, n in other.counts.items():
+            self.counts[name] += n
+        for name, seconds in other.timers.items():
+            self.timers[name] += seconds
+
+        return self
+
+    def to_json(self):
+        return {'counts': dict(self.counts), 'timers': dict(self.timers)}
+
+
+def timed(iterable, stats, name):
+    '''
+    Wraps an iterable and adds the time spent waiting on each item to a
+    timer.
+    '''
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.time(name, time.perf_counter() - start)
+            return
+        stats.time(name, time.perf_counter() - start)
+        yield item
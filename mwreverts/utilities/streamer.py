@@ -0,0 +1,287 @@
+import bz2
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import time
+from multiprocessing import cpu_count
+
+import docopt
+import mwcli
+import para
+from mwcli import files
+
+from .columnar import WRITERS
+from .progress import INTERVAL, CountingReader, Progress
+from .stats import Stats
+
+
+class Streamer(mwcli.Streamer):
+    """
+    Extends :class:`mwcli.Streamer` with binary output formats and run
+    statistics.
+
+    * ``--format=<type>`` -- When set to anything but `json`, outputs are
+      handed to a writer from :data:`mwreverts.utilities.columnar.WRITERS`
+      rather than written as JSON lines.  ``--output`` and ``--compress``
+      are handled as usual.  The fields that the writer reads (its
+      `FIELDS`) are added to the processor's `fields` projection if one is
+      set.
+    * ``--stats=<path>`` -- A :class:`~mwreverts.utilities.stats.Stats` is
+      passed to the processor of each input file (as `stats`).  The stats of
+      all files are merged and written to `<path>` as JSON.
+    * ``--verbose`` and ``--progress-interval=<ms>`` -- A shared
+      :class:`~mwreverts.utilities.progress.Progress` is passed to the
+      processor of each input file (as `progress`) along with its `stats`.
+      Input consumption is counted as `bytes_read`.
+
+    Input files are processed largest-first (see
+    :func:`~mwreverts.utilities.streamer.schedule`) by `--threads` processes
+    that each take the next file as soon as they finish one.  The time taken
+    and throughput of each file are logged.
+
+    If `binary` is set, input files are handed to the `file_reader` as binary
+    files and input paths may have any extension.  If `pass_path` is set,
+    the path of each input file (or the <stdin> file) is passed to the
+    processor as `path`.
+
+    `pool_kwargs` names the processor's keyword arguments that make it start
+    its own pool of processes when they are greater than zero (e.g.
+    `page_workers`).  The `--threads` processes are daemonic and can't have
+    children, so input files are then processed one at a time by this
+    process instead.
+    """
+
+    def __init__(self, *args, binary=False, pass_path=False, pool_kwargs=(),
+                 **kwargs):
+        super().__init__(*args, **kwargs)
+        self.binary = binary
+        self.pass_path = pass_path
+        self.pool_kwargs = tuple(pool_kwargs)
+        self.process_utility_args = self.process_args
+        self.process_args = self.process_streamer_args
+        self.output_format = "json"
+        self.stats_path = None
+        self.progress_interval = INTERVAL
+
+    def main(self, argv=None):
+        if not self.binary:
+            return super().main(argv)
+
+        # mwcli.Streamer.main() rejects paths without a text file extension
+        args = docopt.docopt(self.doc, argv=argv)
+
+        logging.basicConfig(
+            level=logging.INFO if not args['--debug'] else logging.DEBUG,
+            format='%(asctime)s %(levelname)s:%(name)s -- %(message)s'
+        )
+
+        if len(args['<input-file>']) == 0:
+            paths = [io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')]
+        else:
+            paths = [normalize_binary_path(p) for p in args['<input-file>']]
+
+        kwargs = self.process_args(args)
+
+        if args['--threads'] == "<cpu_count>":
+            threads = cpu_count()
+        else:
+            threads = int(args['--threads'])
+
+        if args['--output'] == "<stdout>":
+            output_dir = None
+            compression = None
+        else:
+            output_dir = files.normalize_dir(args['--output'])
+            compression = args['--compress']
+
+        verbose = bool(args['--verbose'])
+
+        self.run(paths, threads, kwargs, output_dir, compression, verbose)
+
+    def process_streamer_args(self, args):
+        self.output_format = args['--format']
+        if self.output_format != "json" and \
+           self.output_format not in WRITERS:
+            raise ValueError("Output format {0} is not supported."
+                             .format(repr(self.output_format)))
+
+        self.stats_path = args['--stats'] \
+            if args['--stats'] != "<none>" else None
+        self.progress_interval = float(args['--progress-interval']) / 1000
+
+        kwargs = self.process_utility_args(args)
+        if self.output_format != "json" and \
+           kwargs.get('fields') is not None:
+            kwargs['fields'] = kwargs['fields'] + \
+                [field for field in WRITERS[self.output_format].FIELDS
+                 if field not in kwargs['fields']]
+
+        return kwargs
+
+    def run(self, paths, threads, kwargs, output_dir, compression, verbose):
+        start = time.time()
+        collect_stats = self.stats_path is not None
+        progress = Progress(interval=self.progress_interval) \
+            if verbose else None
+
+        def process_path(path):
+            file_start = time.time()
+            f = open_binary(path) if self.binary else files.reader(path)
+            path_kwargs = {'path': path} if self.pass_path else {}
+
+            if collect_stats or progress is not None:
+                stats = Stats()
+                input = self.file_reader(CountingReader(f, stats))
+                outputs = self.a2b(input, verbose=verbose, stats=stats,
+                                   progress=progress, **path_kwargs,
+                                   **kwargs)
+            else:
+                input = self.file_reader(f)
+                outputs = self.a2b(input, verbose=verbose, **path_kwargs,
+                                   **kwargs)
+
+            counter = [0]
+            outputs = counted(outputs, counter)
+            if output_dir is None:
+                yield from outputs
+            else:
+                self.write_path(outputs, path, output_dir, compression)
+            self.log_throughput(path, counter[0], time.time() - file_start)
+
+            if progress is not None:
+                progress.tick(stats, force=True)
+            if collect_stats:
+                stats.count('files')
+                yield stats
+
+        stats = Stats()
+        if self.uses_pool(kwargs):
+            if len(paths) > 1 and threads > 1:
+                self.logger.info("Processing files one at a time since " +
+                                 "pages are processed in a pool of processes")
+            outputs = (output for path in schedule(paths)
+                       for output in process_path(path))
+        else:
+            outputs = para.map(process_path, schedule(paths), mappers=threads)
+        if output_dir is None:
+            self.write(outputs, sys.stdout, sys.stdout.buffer, stats)
+        else:
+            for stats_output in outputs:
+                stats.merge(stats_output)
+
+        if progress is not None:
+            progress.close()
+
+        if collect_stats:
+            doc = stats.to_json()
+            doc['elapsed'] = time.time() - start
+            with open(self.stats_path, "w") as f:
+                json.dump(doc, f, indent=2, sort_keys=True)
+                f.write("\n")
+
+    def uses_pool(self, kwargs):
+        return any((kwargs.get(name) or 0) > 0 for name in self.pool_kwargs)
+
+    def log_throughput(self, path, n_outputs, elapsed):
+        size = input_size(path)
+        if size is None:
+            self.logger.info("Processed {0}: {1} outputs in {2:.1f} seconds"
+                             .format(getattr(path, 'name', path), n_outputs,
+                                     elapsed))
+        else:
+            self.logger.info(
+                ("Processed {0}: {1:,.1f} MB and {2} outputs in {3:.1f} " +
+                 "seconds ({4:,.2f} MB/s)").format(
+                    path, size / 2 ** 20, n_outputs, elapsed,
+                    size / 2 ** 20 / max(elapsed, 1e-9)))
+
+    def write_path(self, outputs, path, output_dir, compression):
+        if self.output_format == "json":
+            new_path = files.output_dir_path(path, output_dir, compression)
+            with files.writer(new_path) as f:
+                self.write(outputs, f, None)
+        else:
+            new_path = files.output_dir_path(path, output_dir,
+                                             self.output_format)
+            with open(new_path, 'wb') as f:
+                self.write(outputs, None, f,
+                           compress=compression != "plaintext")
+
+    def write(self, outputs, f, binary_f, stats=None, compress=False):
+        if self.output_format == "json":
+            writer = None
+        else:
+            writer = WRITERS[self.output_format](binary_f, compress=compress)
+
+        for output in outputs:
+            if isinstance(output, Stats):
+                stats.merge(output)
+            elif writer is None:
+                self.line_writer(output, f)
+            else:
+                writer.write(output)
+
+        if writer is not None:
+            writer.close()
+
+
+def schedule(paths):
+    """
+    Orders input paths largest-first by their size on disk so that the
+    largest files aren't left to run alone at the end of a multi-file run.
+    Files without a known size (e.g. <stdin>) are left last.
+    """
+    return sorted(paths, key=lambda path: -(input_size(path) or 0))
+
+
+def input_size(path_or_f):
+    """
+    Returns the size of an input path on disk or `None` for a file.
+    """
+    if hasattr(path_or_f, "read"):
+        return None
+    else:
+        return os.path.getsize(path_or_f)
+
+
+def counted(outputs, counter):
+    # Counts outputs (excluding Stats) in counter[0]
+    for output in outputs:
+        if not isinstance(output, Stats):
+            counter[0] += 1
+        yield output
+
+
+def normalize_binary_path(path):
+    """
+    Verifies that a file exists at a path.  Unlike
+    :func:`mwcli.files.normalize_path`, any extension is accepted.
+    """
+    path = os.path.expanduser(path)
+    if os.path.isdir(path):
+        raise IsADirectoryError("Is a directory: {0}".format(path))
+    elif not os.path.isfile(path):
+        raise FileNotFoundError("No such file: {0}".format(path))
+
+    return path
+
+
+def open_binary(path_or_f):
+    """
+    Opens a (possibly compressed) path or file-like object for binary
+    reading.  Unlike :func:`mwcli.files.reader`, paths with unrecognized
+    extensions are opened as plain files.
+    """
+    if hasattr(path_or_f, "read"):
+        return getattr(path_or_f, "buffer", path_or_f)
+
+    _, extension = files.functions.extract_extension(path_or_f)
+    if extension == "gz":
+        return gzip.open(path_or_f, "rb")
+    elif extension == "bz2":
+        return bz2.open(path_or_f, "rb")
+    else:
+        return open(path_or_f, "rb")
@@ -0,0 +1,129 @@
+"""
+Reads revision documents from stub (``stub-meta-history``) XML dumps.  Only
+the `page`, `id`, `timestamp` and `sha1` of each revision and the requested
+fields are read.  Elements are parsed with
+:func:`xml.etree.ElementTree.iterparse` and discarded as soon as their
+revision has been read.  Revision text (which stub dumps don't contain) is
+never converted.
+
+Fields that can be read are ``user``, ``comment``, ``minor``, ``parent_id``,
+``model`` and ``format``.  Other fields are ignored.
+
+.. autofunction:: mwreverts.utilities.stub_reader.read_rev_docs
+"""
+from xml.etree.ElementTree import iterparse
+
+
+def read_user(element):
+    if element.get('deleted') is not None:
+        return None
+    user_id, user_text = None, None
+    for child in element:
+        tag = local_name(child.tag)
+        if tag == "id":
+            user_id = int(child.text)
+        elif tag in ("username", "ip"):
+            user_text = child.text
+
+    user = {}
+    if user_id is not None:
+        user['id'] = user_id
+    if user_text is not None:
+        user['text'] = user_text
+    return user
+
+
+def read_text(element):
+    if element.get('deleted') is not None:
+        return None
+    return element.text
+
+
+def read_int(element):
+    return int(element.text) if element.text else None
+
+
+def read_true(element):
+    return True
+
+
+FIELDS = {
+    'user': ("contributor", read_user, None),
+    'comment': ("comment", read_text, None),
+    'minor': ("minor", read_true, False),
+    'parent_id': ("parentid", read_int, None),
+    'model': ("model", read_text, None),
+    'format': ("format", read_text, None)
+}
+"""
+Readable fields: field name --> (XML tag, reader, default)
+"""
+
+
+def local_name(tag):
+    return tag.rpartition("}")[2]
+
+
+def read_rev_docs(f, fields=None):
+    """
+    Generates a page-partitioned sequence of revision documents from a stub
+    dump.
+
+    :Parameters:
+        f : `file`
+            an XML dump file
+        fields : `iterable` ( `str` )
+            fields to read in addition to `page`, `id`, `timestamp` and `sha1`
+            (see :data:`~mwreverts.utilities.stub_reader.FIELDS`)
+    """
+    readers = {}
+    defaults = {}
+    for field in fields or ():
+        if field in FIELDS:
+            tag, reader, default = FIELDS[field]
+            readers[tag] = (field, reader)
+            if default is not None:
+                defaults[field] = default
+
+    context = iterparse(f, events=("start", "end"))
+    _, root = next(context)
+    namespace = root.tag[:-len(local_name(root.tag))]
+    page_tag, revision_tag = namespace + "page", namespace + "revision"
+    id_tag, timestamp_tag, sha1_tag = \
+        namespace + "id", namespace + "timestamp", namespace + "sha1"
+    readers = {namespace + tag: reader for tag, reader in readers.items()}
+
+    page, page_doc = None, None
+    for event, element in context:
+        if event == "start":
+            if element.tag == page_tag:
+                page, page_doc = element, None
+        elif element.tag == revision_tag:
+            if page_doc is None:
+                page_doc = {'id': int(page.findtext(namespace + "id")),
+                            'title': page.findtext(namespace + "title")}
+                page_namespace = page.findtext(namespace + "ns")
+                if page_namespace is not None:
+                    page_doc['namespace'] = int(page_namespace)
+
+            rev_doc = dict(defaults)
+            rev_doc['page'] = page_doc
+            for child in element:
+                tag = child.tag
+                if tag == id_tag:
+                    rev_doc['id'] = int(child.text)
+                elif tag == timestamp_tag:
+                    rev_doc['timestamp'] = child.text
+                elif tag == sha1_tag:
+                    if child.text:
+                        rev_doc['sha1'] = child.text
+                elif tag in readers:
+                    field, reader = readers[tag]
+                    value = reader(child)
+                    if value is not None:
+                        rev_doc[field] = value
+
+            page.remove(element)
+            yield rev_doc
+        elif element.tag == page_tag:
+            root.remove(element)